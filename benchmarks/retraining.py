@@ -0,0 +1,28 @@
+import time
+
+# Local imports
+import sys
+sys.path.append("..")
+sys.path.append(".")
+from clairvoyant.engine import Backtest
+from synthetic import market, names
+
+def run(data, train, test, **policy):
+    b = Backtest(names(2), 0, train-1, train, train+test, 0.5, 0.5, continueTraining=True, **policy)
+    start = time.perf_counter()
+    b.start(data, random_state=0)
+    return time.perf_counter()-start
+
+if __name__ == '__main__':
+    train, test = 500, 500
+    data = market(train+test+2)
+    policies = [('Full refit every day', {}),
+                ('Refit every 20 days',  {'retrainEvery': 20}),
+                ('Window of 500 days',   {'trainWindow': 500}),
+                ('Every 20, window 500', {'retrainEvery': 20, 'trainWindow': 500})]
+
+    baseline = None
+    for name, policy in policies:
+        seconds = run(data, train, test, **policy)
+        baseline = baseline or seconds
+        print("{0:<22}: {1:8.2f}s  ({2:.1f}x)".format(name, seconds, baseline/seconds))
@@ -0,0 +1,144 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+
+# Local imports
+import sys
+sys.path.append("..")
+sys.path.append(".")
+from clairvoyant import engine, exchange, helpers
+from synthetic import market, names
+
+BARS      = (1000, 10000, 100000)
+FEATURES  = (2, 10, 50)
+POSITIONS = (1, 10, 100, 1000)
+TRAIN     = 500 # Training window, keeps SVC fitting out of the scaling
+
+def measure(function, repeat=1):
+    # Best wall time over repeat untraced runs after an untraced warm-up, so
+    # neither lazy imports nor tracing count, and peak traced memory of one
+    # more run on its own
+    function()
+    best = float('inf')
+    for i in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter()-start)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+def engineStart(bars, features):
+    data = market(bars+2, features)
+    b = engine.Backtest(names(features), 0, TRAIN-1, TRAIN, bars, 0.55, 0.55)
+    seconds, peak = measure(lambda: b.start(data, random_state=0))
+
+    # Phases of the same run, timed on their own
+    phases = {}
+    start = time.perf_counter()
+    X, y = b.window(data, 0, TRAIN)
+    testX = helpers.columns(data, b.features, TRAIN, bars)
+    phases['extract'] = time.perf_counter()-start
+    model = engine.Model(random_state=0)
+    phases['fit'], _ = measure(lambda: model.fit(X, y))
+    phases['predict'], _ = measure(lambda: model.predictBatch(testX))
+    return {'seconds': seconds, 'barsPerSecond': (bars-TRAIN)/seconds, 'peakBytes': peak, 'phases': phases}
+
+def simulationStart(bars):
+    data = market(bars+2)
+    def logic(account, row, prediction, confidence):
+        if prediction == 1 and account.BuyingPower > 1:
+            account.EnterPosition('Long', account.BuyingPower*0.1, row['close'])
+        elif prediction == -1:
+            for p in account.Positions: account.ClosePosition(p, 1.0, row['close'])
+    s = engine.Simulation(names(2), 0, TRAIN-1, TRAIN, bars, 0.55, 0.55)
+    seconds, peak = measure(lambda: s.start(data, 10000, logic, random_state=0))
+    return {'seconds': seconds, 'barsPerSecond': (bars-TRAIN)/seconds, 'peakBytes': peak}
+
+def modelLatency(bars, features):
+    data = market(bars+1, features)
+    b = engine.Backtest(names(features), 0, bars-1, 0, 0)
+    X, y = b.window(data, 0, bars)
+    model = engine.Model(random_state=0)
+    fit, peak = measure(lambda: model.fit(X, y))
+    predict, _ = measure(lambda: model.predict(X[0]), repeat=50)
+    return {'fitSeconds': fit, 'predictSeconds': predict, 'peakBytes': peak}
+
+def totalValue(positions):
+    a = exchange.Account(positions*100)
+    for i in range(positions):
+        a.EnterPosition('Long' if i % 2 else 'Short', 100, 10)
+    seconds, peak = measure(lambda: a.TotalValue(11), repeat=100)
+    return {'seconds': seconds, 'positionsPerSecond': positions/seconds, 'peakBytes': peak}
+
+def statistics(trades):
+    data = market(TRAIN+2)
+    s = engine.Simulation(names(2), 0, 0, 0, TRAIN)
+    s.data, s.account = data, exchange.Account(trades*100)
+    for i in range(trades):
+        s.account.EnterPosition('Long', 100, 10)
+        s.account.ClosePosition(s.account.Positions[-1], 1.0, 11)
+    with contextlib.redirect_stdout(io.StringIO()):
+        seconds, peak = measure(s.statistics, repeat=10)
+    return {'seconds': seconds, 'peakBytes': peak}
+
+def importTime(module, repeat=5):
+    # Fresh interpreter each time, best of repeat
+    code = "import time; t = time.perf_counter(); import {0}; print(time.perf_counter()-t)".format(module)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return {'seconds': min(float(subprocess.check_output([sys.executable, '-c', code], cwd=root)) for i in range(repeat))}
+
+def run(quick=False):
+    bars = BARS[:2] if quick else BARS
+    results = [dict(case='importTime', module=m, **importTime(m)) for m in ('clairvoyant.engine', 'clairvoyant.parallel')]
+    for n in bars:
+        for f in FEATURES:
+            results.append(dict(case='engineStart', bars=n, features=f, **engineStart(n, f)))
+        results.append(dict(case='simulationStart', bars=n, **simulationStart(n)))
+    for n in (TRAIN, 2*TRAIN):
+        for f in FEATURES:
+            results.append(dict(case='modelLatency', bars=n, features=f, **modelLatency(n, f)))
+    for p in POSITIONS:
+        results.append(dict(case='totalValue', positions=p, **totalValue(p)))
+    for t in (100, 10000):
+        results.append(dict(case='statistics', trades=t, **statistics(t)))
+    return results
+
+def commit():
+    try: return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError): return None
+
+def key(result):
+    return tuple(sorted((k, v) for k, v in result.items() if k in ('case', 'module', 'bars', 'features', 'positions', 'trades')))
+
+def compare(old, new):
+    # Ratio of old to new time for every case in both runs, > 1 is faster
+    before = {key(r): r for r in old['results']}
+    for result in new['results']:
+        if key(result) not in before: continue
+        metric = 'seconds' if 'seconds' in result else 'fitSeconds'
+        ratio = before[key(result)][metric]/result[metric]
+        print("{0:<60} {1:6.2f}x".format(str(dict(key(result))), ratio))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark engine and exchange hot paths")
+    parser.add_argument('--quick', action='store_true', help="skip the 100k bar cases")
+    parser.add_argument('--output', default='benchmark.json', help="where to save results")
+    parser.add_argument('--compare', help="earlier results to compare against")
+    args = parser.parse_args()
+
+    report = {'commit': commit(), 'python': platform.python_version(), 'machine': platform.machine(),
+              'date': time.strftime('%Y-%m-%d %H:%M:%S'), 'results': run(args.quick)}
+    with open(args.output, 'w') as f: json.dump(report, f, indent=2)
+    print("Saved {0} results to {1}".format(len(report['results']), args.output))
+
+    if args.compare:
+        with open(args.compare) as f: compare(json.load(f), report)
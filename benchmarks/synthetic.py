@@ -0,0 +1,16 @@
+import numpy as np
+import pandas as pd
+
+def market(bars, features=2, seed=0):
+    # Random walk OHLC bars with independent noise features X1..Xn
+    rng = np.random.RandomState(seed)
+    close = 100*np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+    data = pd.DataFrame({'date':  pd.date_range('2000-01-01', periods=bars, freq='min'),
+                         'open':  close*(1+rng.normal(0, 0.005, bars)),
+                         'close': close})
+    for i in range(features):
+        data['X{0}'.format(i+1)] = rng.normal(size=bars)
+    return data
+
+def names(features):
+    return ['X{0}'.format(i+1) for i in range(features)]
@@ -0,0 +1,60 @@
+# Classifier factories for Model. Each returns an unfitted estimator whose
+# predict_proba columns are (negative, positive). sklearn is imported on use.
+
+def svc(probability=True, **kwargs):
+    from sklearn.svm import SVC
+    return SVC(probability=probability, **kwargs)
+
+def logistic(**kwargs):
+    from sklearn.linear_model import LogisticRegression
+    return LogisticRegression(**kwargs)
+
+def linear(**kwargs):
+    # Linear SVM, probabilities come from calibration
+    from sklearn.svm import LinearSVC
+    return LinearSVC(**kwargs)
+
+def sgd(**kwargs):
+    from sklearn.linear_model import SGDClassifier
+    return SGDClassifier(loss='log_loss', **kwargs)
+
+def nystroem(components=100, gamma=None, random_state=None, **kwargs):
+    # RBF kernel approximated on a sample of the training set, then a linear model
+    from sklearn.kernel_approximation import Nystroem
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+    return make_pipeline(Nystroem(gamma=gamma, n_components=components, random_state=random_state),
+                         LogisticRegression(**kwargs))
+
+def fourier(components=100, gamma=1.0, random_state=None, **kwargs):
+    # RBF kernel approximated with random Fourier features, then a linear model
+    from sklearn.kernel_approximation import RBFSampler
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+    return make_pipeline(RBFSampler(gamma=gamma, n_components=components, random_state=random_state),
+                         LogisticRegression(**kwargs))
+
+def boosting(**kwargs):
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    return HistGradientBoostingClassifier(**kwargs)
+
+BACKENDS = {'svc': svc, 'logistic': logistic, 'linear': linear, 'sgd': sgd,
+            'nystroem': nystroem, 'fourier': fourier, 'boosting': boosting}
+
+def create(backend='svc', calibration=None, folds=3, **kwargs):
+    if not isinstance(backend, str):
+        # An estimator instance, cloned so every Model fits its own copy
+        from sklearn.base import clone
+        estimator = clone(backend)
+    elif backend not in BACKENDS:
+        raise ValueError("Error: Unknown model backend {0}".format(backend))
+    else:
+        if backend == 'svc' and calibration: kwargs['probability'] = False # Calibrated below instead
+        if backend == 'linear' and not calibration: calibration = 'sigmoid' # LinearSVC has no probabilities
+        estimator = BACKENDS[backend](**kwargs)
+
+    if calibration:
+        # One estimator on all data, calibrated on out of fold predictions
+        from sklearn.calibration import CalibratedClassifierCV
+        estimator = CalibratedClassifierCV(estimator, method=calibration, cv=folds, ensemble=False)
+    return estimator
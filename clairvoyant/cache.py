@@ -0,0 +1,68 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+
+from numpy import ascontiguousarray
+
+class ModelCache:
+    # Fitted models keyed by training set, features and model arguments,
+    # held in memory with LRU eviction and optionally pickled to path
+    def __init__(self, size=16, path=None):
+        self.size   = size
+        self.path   = path
+        self.models = OrderedDict()
+        self.hits   = 0
+        self.loads  = 0
+        self.misses = 0
+        if path is not None: os.makedirs(path, exist_ok=True)
+
+    def key(self, X, y, features, kwargs):
+        digest = hashlib.sha256()
+        for values in (X, y):
+            values = ascontiguousarray(values)
+            digest.update(repr((values.dtype.str, values.shape)).encode())
+            digest.update(values.tobytes())
+        digest.update(repr((list(features), sorted(kwargs.items()))).encode())
+        return digest.hexdigest()
+
+    def file(self, key):
+        return os.path.join(self.path, "{0}.pkl".format(key))
+
+    def get(self, key):
+        if key in self.models:
+            self.hits += 1
+            self.models.move_to_end(key)
+            return self.models[key]
+
+        if self.path is not None and os.path.exists(self.file(key)):
+            self.loads += 1
+            with open(self.file(key), 'rb') as f: model = pickle.load(f)
+            self.remember(key, model)
+            return model
+
+        self.misses += 1
+        return None
+
+    def put(self, key, model):
+        self.remember(key, model)
+        if self.path is not None:
+            # Write then rename so readers never see a partial file
+            fd, temporary = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f: pickle.dump(model, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, self.file(key))
+
+    def remember(self, key, model):
+        self.models[key] = model
+        self.models.move_to_end(key)
+        while len(self.models) > self.size:
+            self.models.popitem(last=False)
+
+    def clear(self):
+        self.models.clear()
+
+    def stats(self):
+        lookups = self.hits+self.loads+self.misses
+        return {'hits': self.hits, 'loads': self.loads, 'misses': self.misses, 'size': len(self.models),
+                'hitRate': round(float(self.hits+self.loads)/lookups*100, 2) if lookups else float(0)}
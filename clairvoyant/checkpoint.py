@@ -0,0 +1,82 @@
+import io
+import os
+import pickle
+import tempfile
+
+from numpy import concatenate, ndarray
+
+class Checkpoint:
+    # Engine state saved to the directory path every few bars so that an
+    # interrupted run picks up from the last saved bar instead of starting
+    # over. Growing histories are streams, files of pickled chunks to which
+    # each save only appends the rows added since the one before, the rest
+    # of the state is small and rewritten every time.
+    def __init__(self, path, every=250):
+        if every < 1: raise ValueError("Error: Checkpoints must be at least 1 bar apart.")
+        self.path    = path
+        self.every   = every
+        self.saves   = 0
+        self.written = 0    # Bytes written by the last save
+        self.saved   = None # Stream name to (rows, bytes) as of the last save
+
+    def file(self, name):
+        return os.path.join(self.path, "{0}.pkl".format(name))
+
+    def exists(self):
+        return os.path.exists(self.file('state'))
+
+    def due(self, n):
+        return n % self.every == 0
+
+    def save(self, state, streams):
+        if self.saved is None:
+            os.makedirs(self.path, exist_ok=True)
+            self.saved = {}
+        written, saved = 0, dict(self.saved)
+        for name, values in streams.items():
+            rows, size = saved.get(name, (0, 0))
+            if len(values) < rows: raise ValueError("Error: Checkpoint stream {0} shrank.".format(name))
+            if name in saved and len(values) == rows: continue
+            with open(self.file(name), 'r+b' if name in saved else 'wb') as f:
+                f.truncate(size) # Drop rows appended by an interrupted save
+                f.seek(size)
+                pickle.dump(values[rows:], f, pickle.HIGHEST_PROTOCOL)
+                saved[name] = (len(values), f.tell())
+            written += saved[name][1]-size
+
+        # The state names the rows in each stream, so it's written last and
+        # then renamed over the previous one
+        fd, temporary = tempfile.mkstemp(dir=self.path, prefix='state-', suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump({'state': state, 'streams': saved}, f, pickle.HIGHEST_PROTOCOL)
+            written += f.tell()
+        os.replace(temporary, self.file('state'))
+        self.saved, self.written = saved, written
+        self.saves += 1
+
+    def load(self):
+        # (state, streams) of the last save, each stream joined into one list or array
+        with open(self.file('state'), 'rb') as f: saved = pickle.load(f)
+        streams = {}
+        for name, (rows, size) in saved['streams'].items():
+            with open(self.file(name), 'rb') as f: data = io.BytesIO(f.read(size))
+            chunks = []
+            while data.tell() < size: chunks.append(pickle.load(data))
+            if isinstance(chunks[0], ndarray): streams[name] = concatenate(chunks)
+            else:                              streams[name] = [value for chunk in chunks for value in chunk]
+        self.saved = saved['streams']
+        return saved['state'], streams
+
+    def clear(self):
+        # Remove only the files saves wrote, and path once nothing else is left
+        saved = self.saved
+        if saved is None and self.exists():
+            with open(self.file('state'), 'rb') as f: saved = pickle.load(f)['streams']
+        files = [self.file(name) for name in ['state']+list(saved or ())]
+        if os.path.isdir(self.path):
+            files += [os.path.join(self.path, f) for f in os.listdir(self.path) if f.startswith('state-') and f.endswith('.tmp')]
+        for file in files:
+            if os.path.exists(file): os.remove(file)
+        try: os.rmdir(self.path)
+        except OSError: pass # Holds files of the caller's
+        self.saved = None
@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+class Rows:
+    # Positional row access, the subset of DataFrame.iloc the engines use
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def __getitem__(self, i):
+        return pd.Series([self.dataset[column][i] for column in self.dataset.columns],
+                         index=self.dataset.columns, dtype=object, name=i)
+
+class Dataset:
+    # Columns read lazily from files and kept memory mapped where the format
+    # allows, accepted by Backtest, Simulation and Portfolio in place of a DataFrame
+    def __init__(self, loaders, files=None):
+        self.loaders = loaders
+        self.columns = list(loaders)
+        self.files   = files or {} # Columns already stored as .npy files
+        self.arrays  = {}
+        self.iloc    = Rows(self)
+
+    def __getitem__(self, column):
+        if column not in self.arrays:
+            if column not in self.loaders: raise KeyError(column)
+            self.arrays[column] = self.loaders[column]()
+        return self.arrays[column]
+
+    def __contains__(self, column):
+        return column in self.loaders
+
+    def __len__(self):
+        # Any mapped column will do, avoid mapping one just for its length
+        if self.arrays: return len(next(iter(self.arrays.values())))
+        return len(self[self.columns[0]])
+
+    def select(self, columns):
+        # A view whose rows hold only columns, mapping into the same arrays
+        view = Dataset({column: self.loaders[column] for column in dict.fromkeys(columns) if column in self.loaders}, self.files)
+        view.arrays = self.arrays
+        return view
+
+    def frame(self, start=None, stop=None):
+        # Materialize rows [start, stop) as a DataFrame
+        return pd.DataFrame({column: self[column][start:stop] for column in self.columns})
+
+def fromNumpy(path, columns=None):
+    # A directory of <column>.npy files as written by toNumpy
+    if columns is None:
+        columns = sorted(f[:-4] for f in os.listdir(path) if f.endswith('.npy'))
+    def loader(column):
+        file = os.path.join(path, "{0}.npy".format(column))
+        def load():
+            try: return np.load(file, mmap_mode='r')
+            except ValueError: return np.load(file, allow_pickle=True) # Python objects can't be memory mapped
+        return load
+    return Dataset({column: loader(column) for column in columns},
+                   {column: os.path.join(path, "{0}.npy".format(column)) for column in columns})
+
+def toNumpy(frame, path):
+    os.makedirs(path, exist_ok=True)
+    for column in frame.columns:
+        values = np.asarray(frame[column])
+        np.save(os.path.join(path, "{0}.npy".format(column)), values, allow_pickle=values.dtype.hasobject)
+
+def fromParquet(path, columns=None):
+    # Each column is decoded on first use, so unused columns are never read
+    try: import pyarrow.parquet as pq
+    except ImportError: raise ImportError("Error: Reading Parquet requires pyarrow")
+    source = pq.ParquetFile(path, memory_map=True)
+    if columns is None: columns = source.schema_arrow.names
+    def loader(column):
+        return lambda: source.read(columns=[column]).column(0).to_numpy()
+    return Dataset({column: loader(column) for column in columns})
+
+def fromArrow(path, columns=None):
+    # Arrow IPC (Feather v2) files map without copying uncompressed columns
+    try: import pyarrow as pa
+    except ImportError: raise ImportError("Error: Reading Arrow requires pyarrow")
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    if columns is None: columns = table.column_names
+    def loader(column):
+        return lambda: table.column(column).to_numpy()
+    return Dataset({column: loader(column) for column in columns})
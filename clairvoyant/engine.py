@@ -1,32 +1,54 @@
-from sklearn.svm           import SVC
-from sklearn.preprocessing import RobustScaler
-from matplotlib.colors     import ListedColormap
-from matplotlib            import pyplot
-from bokeh.plotting        import output_file, figure, show
-from numpy                 import vstack, hstack, meshgrid, arange, c_, where
+import copy
+from time import perf_counter
+
+from numpy import vstack, hstack, arange, asarray, c_, empty, where
+from numpy.random import RandomState
 
 # Local imports
-import sys
-sys.path.append("..")
-from clairvoyant import exchange, helpers
+from clairvoyant import backends, exchange, helpers, profiling, rules
+
+# sklearn, pandas, matplotlib and bokeh are imported where they are first
+# needed so that importing the engine stays cheap in worker processes
 
 class Model:
-    def __init__(self, **kwargs):
-        self.kwargs = kwargs
-        self.svc = SVC(probability=True, **kwargs)
+    def __init__(self, backend='svc', calibration=None, folds=3, **kwargs):
+        self.kwargs      = kwargs
+        self.backend     = backend
+        self.calibration = calibration
+        self.estimator   = backends.create(backend, calibration, folds, **kwargs)
+
+    @property
+    def svc(self):
+        return self.estimator
 
     def fit(self, X, y):
+        from sklearn.preprocessing import RobustScaler
         self.XX = vstack(X)
         self.yy = hstack(y)
         self.scaler = RobustScaler().fit(self.XX)
-        self.svc.fit(self.scaler.transform(self.XX), self.yy)
+        self.estimator.fit(self.scaler.transform(self.XX), self.yy)
 
-    def predict(self, Xs):
-        prediction = self.svc.predict_proba(self.scaler.transform([Xs]))[0]
+    def predict(self, Xs, profiler=profiling.NULL):
+        with profiler.phase('scale'): Xs = self.scaler.transform([Xs])
+        with profiler.phase('predictProba'): prediction = self.estimator.predict_proba(Xs)[0]
         return prediction[0], prediction[1] # Negative, Positive
 
+    def predictBatch(self, X, profiler=profiling.NULL):
+        with profiler.phase('scale'): X = self.scaler.transform(X)
+        with profiler.phase('predictProba'): prediction = self.estimator.predict_proba(X)
+        return prediction[:, 0], prediction[:, 1] # Negative, Positive
+
+    def decision(self, X):
+        # Signed score of already scaled rows, positive leans towards a buy
+        if hasattr(self.estimator, 'decision_function'):
+            return self.estimator.decision_function(X)
+        return self.estimator.predict_proba(X)[:, 1]-0.5
+
 class Engine:
-    def __init__(self, features, trainStr, trainEnd, testStr, testEnd, buyThreshold=0.65, sellThreshold=0.65, continueTraining=False):
+    profiler = profiling.NULL
+    counters = ()
+
+    def __init__(self, features, trainStr, trainEnd, testStr, testEnd, buyThreshold=0.65, sellThreshold=0.65, continueTraining=False, retrainEvery=1, trainWindow=None):
         self.model            = None
         self.account          = None
         self.features         = features
@@ -37,66 +59,99 @@ class Engine:
         self.buyThreshold     = buyThreshold
         self.sellThreshold    = sellThreshold
         self.continueTraining = continueTraining
+        self.retrainEvery     = retrainEvery
+        self.trainWindow      = trainWindow
 
-    def start(self, data, capital=None, logic=None, simulation=False, **kwargs):
-        self.data = data
-        self.model = Model(**kwargs)
+    def start(self, data, capital=None, logic=None, simulation=False, model=None, cache=None, pipeline=None, checkpoint=None, **kwargs):
+        if pipeline is not None: data = pipeline.apply(data, self.features)
+        self.data = data = self.select(data)
+        profiler = self.profiler
+        profiler.reset()
 
         # ====================== #
         #    Initial Training    #
         # ====================== #
-        
-        X, y = [], []                                   
-        for i in range(self.trainStr, self.trainEnd+1):
 
-            Xs = [data.iloc[i][var] for var in self.features]
-            X.append(Xs)                             
-            
-            # Find the stock price movement for day 2
-            y1 = helpers.change(data.iloc[i+1].open, data.iloc[i+1].close)
-            if y1 > 0: y.append(1)  # If it went up, classify as 1
-            else:      y.append(-1) # If it went down, classify as -1
-        
-        self.model.fit(X, y)
+        if checkpoint is not None and checkpoint.exists():
+            # Resume with the model, buffers and account of the last checkpoint
+            with profiler.phase('checkpoint'): X, y, first, fitted = self.restore(*checkpoint.load())
+        else:
+            with profiler.phase('extract'): X, y = self.window(data, self.trainStr, self.trainEnd+1)
+
+            with profiler.phase('fit'): self.initialize(X, y, model, cache, **kwargs)
+            profiler.trained(0, len(y))
+
+            X, y, first = helpers.Buffer(X), helpers.Buffer(y), 0
+            fitted = len(y) if model is None else None # Rows of X up to fitted end with the model's training set
+
+            if simulation:
+                self.account = exchange.Account(capital)
 
         # ====================== #
         #         Testing        #
         # ====================== #       
-        
-        if simulation:
-            self.account = exchange.Account(capital)
 
-        for i in range(self.testStr, self.testEnd):
-            
+        with profiler.phase('extract'):
+            testX = helpers.columns(data, self.features, self.testStr, self.testEnd)
+            testY = helpers.movement(data, self.testStr+1, self.testEnd+1)
+        profiler.count('days', len(testY))
+
+        if not self.continueTraining:
+            # Frozen model, score the whole window in one batch
+            neg, pos = self.model.predictBatch(testX, profiler)
+            with profiler.phase('signal'): predictions, confidences = self.signals(neg, pos)
+
+            if not simulation:
+                # Case 1/2: Prediction is positive (buy), next day performance is/isn't positive 
+                # Case 3/4: Prediction is negative (sell), next day performance is/isn't negative
+                with profiler.phase('tally'):
+                    buys, sells = predictions == 1, predictions == -1
+                    self.totalBuys    += int(buys.sum())
+                    self.correctBuys  += int((buys & (testY > 0)).sum())
+                    self.totalSells   += int(sells.sum())
+                    self.correctSells += int((sells & (testY < 0)).sum())
+                profiler.flush()
+                return
+
+            if isinstance(logic, rules.Rule):
+                # Declarative logic runs over the whole window at once
+                with profiler.phase('logic'):
+                    dates = asarray(data['date'])[self.testStr:self.testEnd]
+                    closes = asarray(data['close'])[self.testStr:self.testEnd]
+                    self.account.Equity = logic.run(self.account, dates, closes, predictions).tolist()
+                profiler.flush()
+                return
+
+            predictions, confidences = predictions.tolist(), confidences.tolist()
+
+        for n, i in enumerate(range(self.testStr+first, self.testEnd), first):
+
             # ==================================== #
             #  DAY 1 @ 8:00 PM | Markets closed    #
             #  Make prediction for DAY 2           #
             #  Update Buy/Sell count (or neither)  #
             # ==================================== #        
-            
-            Xs = [data.iloc[i][var] for var in self.features]
-            neg, pos = self.model.predict(Xs)
-            
-            if pos >= self.buyThreshold:  # Positive confidence >= buyThreshold
-                prediction =  1 
-                confidence = pos
-            
-            elif neg >= self.sellThreshold: # If negative confidence >= sellThreshold
-                prediction = -1
-                confidence = neg
 
-            else: prediction = confidence = 0
-            
+            Xs = testX[n]
+
+            if self.continueTraining:
+                neg, pos = self.model.predict(Xs, profiler)
+                with profiler.phase('signal'): prediction, confidence = self.signal(neg, pos)
+            else:
+                prediction, confidence = predictions[n], confidences[n]
+
             if simulation:
+                with profiler.phase('extract'): row = data.iloc[i]
+
                 # Update account variables
-                self.account.Date = data.iloc[i]['date']
-                self.account.Equity.append(self.account.TotalValue(data.iloc[i]['close']))
+                self.account.Date = row['date']
+                with profiler.phase('totalValue'): self.account.Equity.append(self.account.TotalValue(row['close']))
 
                 # Execute trading logic
-                logic(self.account, data.iloc[i], prediction, confidence)
+                with profiler.phase('logic'): logic(self.account, row, prediction, confidence)
 
                 # Cleanup empty positions
-                self.account.PurgePositions()
+                with profiler.phase('purge'): self.account.PurgePositions()
 
             if not simulation:
                 # ==================================== #
@@ -104,31 +159,249 @@ class Engine:
                 #  Analyze results from DAY 2          #
                 #  Record if prediction was correct    #
                 # ==================================== #
-                
+
                 # Case 1/2: Prediction is positive (buy), next day performance is/isn't positive 
                 if prediction == 1:
                     self.totalBuys += 1
-                    if helpers.change(data.iloc[i+1].open, data.iloc[i+1].close) > 0:
+                    if testY[n] > 0:
                         self.correctBuys += 1
-                
+
                 # Case 3/4: Prediction is negative (sell), next day performance is/isn't negative
                 elif prediction == -1:
                     self.totalSells += 1
-                    if helpers.change(data.iloc[i+1].open, data.iloc[i+1].close) < 0:
+                    if testY[n] < 0:
                         self.correctSells += 1
-            
+
             # ====================== #
             #     Update Model       #
             #     if specified       #
             # ====================== #
-            
+
             if self.continueTraining:
                 X.append(Xs)     
-                
-                if change(data, i+1) > 0: y.append(1)
-                else:                     y.append(-1)
-                
-                self.model.fit(X, y)
+
+                if testY[n] > 0: y.append(1)
+                else:            y.append(-1)
+
+                # Refit every retrainEvery days on at most trainWindow days
+                if (n+1) % self.retrainEvery == 0:
+                    with profiler.phase('retrain'): self.model.fit(X.view(self.trainWindow), y.view(self.trainWindow))
+                    fitted = len(X)
+                    profiler.count('retrains')
+                    profiler.trained(n+1, len(self.model.yy))
+
+            if checkpoint is not None and checkpoint.due(n+1):
+                with profiler.phase('checkpoint'): checkpoint.save(*self.snapshot(X, y, n+1, fitted))
+                profiler.count('checkpoints')
+
+        if checkpoint is not None: checkpoint.clear() # Finished runs start over
+        profiler.flush()
+
+    def snapshot(self, X, y, first, fitted):
+        # Everything the test loop needs to carry on from day first, as the
+        # small state and the growing streams a checkpoint appends to
+        streams = {'X': X.view(), 'y': y.view()}
+        model, account = self.model, self.account
+        if fitted is not None:
+            # The model's training set is the end of X up to fitted
+            model = copy.copy(model)
+            del model.XX, model.yy
+            fitted = (fitted-len(self.model.yy), fitted)
+        if account is not None:
+            account = copy.copy(account)
+            account.Equity, account.OpenedTrades, account.ClosedTrades = None, None, None
+            streams['Equity'] = self.account.Equity
+            for name in ('OpenedTrades', 'ClosedTrades'):
+                for Field, Column in getattr(self.account, name).Columns.items():
+                    streams["{0}.{1}".format(name, Field)] = Column.view()
+        counters = {name: getattr(self, name) for name in self.counters}
+        state = {'engine': self.settings(), 'first': first, 'fitted': fitted, 'model': model,
+                 'account': account, 'counters': counters}
+        return state, streams
+
+    def restore(self, state, streams):
+        if state['engine'] != self.settings():
+            raise ValueError("Error: Checkpoint was saved by a differently configured engine.")
+        X, y = helpers.Buffer(streams['X']), helpers.Buffer(streams['y'])
+        self.model, fitted = state['model'], state['fitted']
+        if fitted is not None:
+            self.model.XX, self.model.yy = X.view()[fitted[0]:fitted[1]].copy(), y.view()[fitted[0]:fitted[1]].copy()
+            fitted = fitted[1]
+        self.account = state['account']
+        if self.account is not None:
+            self.account.Equity = streams['Equity']
+            self.account.OpenedTrades = exchange.Ledger(exchange.OpenedTrade)
+            self.account.ClosedTrades = exchange.Ledger(exchange.ClosedTrade)
+            for name in ('OpenedTrades', 'ClosedTrades'):
+                Columns = getattr(self.account, name).Columns
+                for Field in Columns: Columns[Field] = helpers.Buffer(streams["{0}.{1}".format(name, Field)])
+        for name, value in state['counters'].items(): setattr(self, name, value)
+        return X, y, state['first'], fitted
+
+    def settings(self):
+        return (type(self).__name__, list(self.features), self.trainStr, self.trainEnd, self.testStr, self.testEnd,
+                self.buyThreshold, self.sellThreshold, self.continueTraining, self.retrainEvery, self.trainWindow)
+
+    def instrument(self, sinks=()):
+        # Opt in to per-phase timings, each report is passed to every sink
+        self.profiler = profiling.Profiler(sinks)
+        return self.profiler
+
+    def report(self):
+        return self.profiler.report()
+
+    def profile(self):
+        report = self.report()
+        if report is None:
+            print("Error: Please instrument engine to generate a profile")
+            return
+
+        print("--------------- Profile ---------------\n")
+        for name, phase in sorted(report['phases'].items(), key=lambda item: -item[1]['seconds']):
+            print("{0:<13}: {1:8.4f}s {2:6.1f}% ({3} calls)".format(name, phase['seconds'], phase['share']*100, phase['calls']))
+        for name, count in report['counters'].items():
+            print("{0:<13}: {1}".format(name, count))
+        if report['trainSizes']:
+            print("Train Size   : {0} -- {1}".format(report['trainSizes'][0][1], report['trainSizes'][-1][1]))
+        print("\n---------------------------------------\n")
+
+    def prepare(self, data, capital=None, logic=None, simulation=False, model=None, cache=None, pipeline=None, **kwargs):
+        # Train on data's training window, then feed test bars to onBar
+        if pipeline is not None:
+            # Bars reach onBar one at a time, without the history indicators need
+            raise ValueError("Error: Streaming needs indicator features already in data and bars, apply the pipeline first")
+        self.data = data = self.select(data)
+        self.logic = logic
+        self.simulation = simulation
+
+        self.profiler.reset()
+        with self.profiler.phase('extract'): X, y = self.window(data, self.trainStr, self.trainEnd+1)
+        with self.profiler.phase('fit'): self.initialize(X, y, model, cache, **kwargs)
+        self.profiler.trained(0, len(y))
+
+        if simulation:
+            self.account = exchange.Account(capital)
+
+        # Rolling state, the training set is only kept to continue training
+        self.X, self.y = (helpers.Buffer(X), helpers.Buffer(y)) if self.continueTraining else (None, None)
+        self.pending = None # Features and prediction awaiting the next bar
+        self.labelled = 0
+        self.latency = {'bars': 0, 'total': 0.0, 'max': 0.0}
+
+    def onBar(self, row):
+        # Resolve yesterday's prediction with today's bar, then predict tomorrow
+        clock = perf_counter()
+        if self.pending is not None:
+            self.resolve(helpers.change(row['open'], row['close']))
+
+        profiler = self.profiler
+        with profiler.phase('extract'): Xs = asarray([row[var] for var in self.features])
+        neg, pos = self.model.predict(Xs, profiler)
+        with profiler.phase('signal'): prediction, confidence = self.signal(neg, pos)
+
+        if self.simulation:
+            self.account.Date = row['date']
+            with profiler.phase('totalValue'): self.account.Equity.append(self.account.TotalValue(row['close']))
+            with profiler.phase('logic'): self.logic(self.account, row, prediction, confidence)
+            with profiler.phase('purge'): self.account.PurgePositions()
+        profiler.count('days')
+
+        self.pending = (Xs, prediction)
+
+        clock = perf_counter()-clock
+        self.latency['bars'] += 1
+        self.latency['total'] += clock
+        self.latency['max'] = max(self.latency['max'], clock)
+        return prediction, confidence
+
+    def stream(self, bars):
+        # Consume any iterable of rows, yielding (prediction, confidence) per bar
+        for row in bars:
+            yield self.onBar(row)
+        self.finish()
+
+    def finish(self):
+        # End of a streaming run, report to the profiler's sinks
+        self.profiler.flush()
+
+    def resolve(self, movement):
+        Xs, prediction = self.pending
+
+        if not self.simulation:
+            if prediction == 1:
+                self.totalBuys += 1
+                if movement > 0: self.correctBuys += 1
+            elif prediction == -1:
+                self.totalSells += 1
+                if movement < 0: self.correctSells += 1
+
+        if self.continueTraining:
+            self.X.append(Xs)
+            self.y.append(1 if movement > 0 else -1)
+            self.labelled += 1
+
+            if self.labelled % self.retrainEvery == 0:
+                with self.profiler.phase('retrain'): self.model.fit(self.X.view(self.trainWindow), self.y.view(self.trainWindow))
+                self.profiler.count('retrains')
+                self.profiler.trained(self.labelled, len(self.model.yy))
+                if self.trainWindow is not None:
+                    self.X.keep(self.trainWindow)
+                    self.y.keep(self.trainWindow)
+
+    def latencies(self):
+        # Per-bar onBar latency in milliseconds
+        bars = self.latency['bars']
+        return {'bars': bars, 'mean': round(self.latency['total']/bars*1000, 3) if bars else float(0),
+                'max': round(self.latency['max']*1000, 3)}
+
+    def initialize(self, X, y, model=None, cache=None, **kwargs):
+        if model is None and cache is not None:
+            # Reuse a model fitted on the same training set and arguments
+            key = cache.key(X, y, self.features, kwargs)
+            model = cache.get(key)
+            if model is None:
+                model = Model(**kwargs)
+                model.fit(X, y)
+                cache.put(key, model)
+
+        if model is None:
+            self.model = Model(**kwargs)
+            self.model.fit(X, y)
+        elif self.continueTraining:
+            self.model = copy.deepcopy(model) # Leave the caller's fitted model intact
+        else:
+            self.model = model
+
+    def select(self, data):
+        # Rows of a Dataset only load the prices and features
+        if not hasattr(data, 'select'): return data
+        return data.select(['date', 'open', 'close'] + list(self.features))
+
+    def window(self, data, start, stop):
+        # Features for each day and the stock price movement for day 2
+        X = helpers.columns(data, self.features, start, stop)
+        y = helpers.classify(helpers.movement(data, start+1, stop+1))
+        return X, y
+
+    def train(self, data, pipeline=None, **kwargs):
+        # Fit a model on the training window without running the test
+        if pipeline is not None: data = pipeline.apply(data, self.features)
+        model = Model(**kwargs)
+        model.fit(*self.window(data, self.trainStr, self.trainEnd+1))
+        return model
+
+    def signal(self, neg, pos):
+        if pos >= self.buyThreshold:    # Positive confidence >= buyThreshold
+            return 1, pos
+        elif neg >= self.sellThreshold: # If negative confidence >= sellThreshold
+            return -1, neg
+        else: return 0, 0
+
+    def signals(self, neg, pos):
+        # Vectorized signal over arrays of confidences
+        buys  = pos >= self.buyThreshold
+        sells = ~buys & (neg >= self.sellThreshold)
+        return where(buys, 1, where(sells, -1, 0)), where(buys, pos, where(sells, neg, 0))
 
     def conditions(self):
         if self.model == None:
@@ -141,6 +414,8 @@ class Engine:
         print("\n---------------------------------------\n")
 
         print("----------- Model Arguments -----------\n")
+        print("backend: {0}".format(self.model.backend))
+        if self.model.calibration: print("calibration: {0}".format(self.model.calibration))
         for kwarg in self.model.kwargs: 
             print("{0}: {1}".format(kwarg, self.model.kwargs[kwarg]))
         print("\n---------------------------------------\n")
@@ -151,9 +426,12 @@ class Engine:
         print("Buy Threshold: {0}%".format(self.buyThreshold*100))
         print("Sell Threshold: {0}%".format(self.sellThreshold*100))
         print("Continued Training: {0}".format(self.continueTraining))
+        if self.continueTraining:
+            print("Retrain Every: {0} days".format(self.retrainEvery))
+            print("Train Window: {0}".format(self.trainWindow or "All"))
         print("\n---------------------------------------\n")
 
-    def visualize(self, name, width=5, height=5, stepsize=0.02):
+    def visualize(self, name, width=5, height=5, stepsize=0.02, resolution=500, points=5000, chunk=65536):
         if len(self.features) != 2:
             print("Error: Plotting is restricted to 2 dimensions")
             return
@@ -162,30 +440,47 @@ class Engine:
             return
             
         X, y = self.model.XX, self.model.yy # Retrieve previous XX and yy                                      
-        X = self.model.scaler.transform(X)  # Normalize X values
-        self.model.svc.fit(X, y)            # Refit model
+        X = self.model.scaler.transform(X)  # Normalize X values, the fitted model is used as is
         
+        # At most resolution steps along each axis, whatever the stepsize
         x_min, x_max = X[:, 0].min() - 0.5, X[:, 0].max() + 0.5    
         y_min, y_max = X[:, 1].min() - 0.5, X[:, 1].max() + 0.5     
-        xx, yy = meshgrid(arange(x_min, x_max, stepsize), arange(y_min, y_max, stepsize))
+        xs = arange(x_min, x_max, max(stepsize, (x_max-x_min)/resolution))
+        ys = arange(y_min, y_max, max(stepsize, (y_max-y_min)/resolution))
+
+        # Decision surface evaluated chunk rows of the grid at a time
+        Z = empty(len(xs)*len(ys))
+        for start in range(0, len(Z), chunk):
+            grid = arange(start, min(start+chunk, len(Z)))
+            Z[start:start+len(grid)] = self.model.decision(c_[xs[grid % len(xs)], ys[grid // len(xs)]])
+        Z = Z.reshape(len(ys), len(xs))
+
+        # Scatter a fixed random sample of large training sets
+        if len(X) > points:
+            sample = RandomState(0).choice(len(X), points, replace=False)
+            X, y = X[sample], y[sample]
         
+        from matplotlib.colors import ListedColormap
+        from matplotlib import pyplot
+
         pyplot.figure(figsize=(width, height))
         cm = pyplot.cm.RdBu  # Red/Blue gradients
         rb = ListedColormap(['#FF312E', '#6E8894']) # Red = 0 (Negative) / Blue = 1 (Positve)
-        Z = self.model.svc.decision_function(c_[xx.ravel(), yy.ravel()])
-        Z = Z.reshape(xx.shape)
         
         Axes = pyplot.subplot(1,1,1)
         Axes.set_title(name)
-        Axes.contourf(xx, yy, Z, cmap=cm, alpha=0.75)
+        Axes.contourf(xs, ys, Z, cmap=cm, alpha=0.75)
         Axes.scatter(X[:, 0], X[:, 1], s=20, c=y, cmap=rb, edgecolors='black') 
-        Axes.set_xlim(xx.min(), xx.max())
-        Axes.set_ylim(yy.min(), yy.max())
+        Axes.set_xlim(xs.min(), xs.max())
+        Axes.set_ylim(ys.min(), ys.max())
         pyplot.savefig("{0}.png".format(name))
+        pyplot.close()
 
 class Backtest(Engine):
-    def __init__(self, features, trainStr, trainEnd, testStr, testEnd, buyThreshold=0.65, sellThreshold=0.65, continueTraining=False):
-        Engine.__init__(self, features, trainStr, trainEnd, testStr, testEnd, buyThreshold, sellThreshold, continueTraining)
+    counters = ('totalBuys', 'correctBuys', 'totalSells', 'correctSells')
+
+    def __init__(self, features, trainStr, trainEnd, testStr, testEnd, buyThreshold=0.65, sellThreshold=0.65, continueTraining=False, retrainEvery=1, trainWindow=None):
+        Engine.__init__(self, features, trainStr, trainEnd, testStr, testEnd, buyThreshold, sellThreshold, continueTraining, retrainEvery, trainWindow)
 
         # Statistics
         self.totalBuys    = 0
@@ -195,6 +490,9 @@ class Backtest(Engine):
         
     def start(self, data, **kwargs):
         Engine.start(self, data, **kwargs)
+
+    def prepare(self, data, **kwargs):
+        Engine.prepare(self, data, **kwargs)
                         
     def buyStats(self):
         try: return round((float(self.correctBuys)/self.totalBuys)*100,2)
@@ -204,6 +502,10 @@ class Backtest(Engine):
         try: return round((float(self.correctSells)/self.totalSells)*100,2)
         except ZeroDivisionError: return float(0)
 
+    def summary(self):
+        return {'totalBuys': self.totalBuys, 'correctBuys': self.correctBuys, 'buyStats': self.buyStats(),
+                'totalSells': self.totalSells, 'correctSells': self.correctSells, 'sellStats': self.sellStats()}
+
     def statistics(self):        
         if self.model == None:
             print("Error: Please start model to generate statistics")
@@ -217,12 +519,28 @@ class Backtest(Engine):
         print("\n---------------------------------------\n")
 
 class Simulation(Engine):
-    def __init__(self, features, trainStr, trainEnd, testStr, testEnd, buyThreshold=0.65, sellThreshold=0.65, continueTraining=False):
-        Engine.__init__(self, features, trainStr, trainEnd, testStr, testEnd, buyThreshold, sellThreshold, continueTraining)
+    def __init__(self, features, trainStr, trainEnd, testStr, testEnd, buyThreshold=0.65, sellThreshold=0.65, continueTraining=False, retrainEvery=1, trainWindow=None):
+        Engine.__init__(self, features, trainStr, trainEnd, testStr, testEnd, buyThreshold, sellThreshold, continueTraining, retrainEvery, trainWindow)
 
     def start(self, data, capital, logic, **kwargs):
         Engine.start(self, data, capital=capital, logic=logic, simulation=True, **kwargs)        
 
+    def prepare(self, data, capital, logic, **kwargs):
+        Engine.prepare(self, data, capital=capital, logic=logic, simulation=True, **kwargs)
+
+    def holdStats(self):
+        BeginPrice = self.data.iloc[self.testStr]['open']
+        FinalPrice = self.data.iloc[self.testEnd]['close']
+        return round(helpers.change(BeginPrice, FinalPrice)*100, 2)
+
+    def strategyStats(self):
+        FinalPrice = self.data.iloc[self.testEnd]['close']
+        return round(helpers.change(self.account.InitialCapital, self.account.TotalValue(FinalPrice))*100, 2)
+
+    def summary(self):
+        return {'holdStats': self.holdStats(), 'strategyStats': self.strategyStats(),
+                'totalValue': self.account.TotalValue(self.data.iloc[self.testEnd]['close'])}
+
     def statistics(self):          
         print("------------- Statistics --------------\n")
         BeginPrice = self.data.iloc[self.testStr]['open']
@@ -236,10 +554,10 @@ class Simulation(Engine):
         print("Strategy     : {0}%".format(round(percentchange*100, 2)))
         print("Net Profit   : {0}".format(round(helpers.profit(self.account.InitialCapital, percentchange), 2)))
 
-        Longs  = len([T for T in self.account.OpenedTrades if T.Type == 'Long'])
-        Sells  = len([T for T in self.account.ClosedTrades if T.Type == 'Long'])
-        Shorts = len([T for T in self.account.OpenedTrades if T.Type == 'Short'])
-        Covers = len([T for T in self.account.ClosedTrades if T.Type == 'Short'])
+        Longs  = self.account.OpenedTrades.Count('Long')
+        Sells  = self.account.ClosedTrades.Count('Long')
+        Shorts = self.account.OpenedTrades.Count('Short')
+        Covers = self.account.ClosedTrades.Count('Short')
 
         print("Longs        : {0}".format(Longs))
         print("Sells        : {0}".format(Sells))
@@ -250,16 +568,141 @@ class Simulation(Engine):
         print("\n---------------------------------------\n")
 
     def chart(self, name):
+        from bokeh.plotting import output_file, figure, show
+
         output_file("{0}.html".format(name), title="Equity Curve")
         p = figure(x_axis_type="datetime", plot_width=1000, plot_height=400, title="Equity Curve")
         p.grid.grid_line_alpha = 0.3
         p.xaxis.axis_label = 'Date'
         p.yaxis.axis_label = 'Equity'
         
-        Shares = self.account.InitialCapital/self.data.iloc[self.testStr].open
-        BaseEquity = [Price*Shares for Price in self.data[self.testStr:self.testEnd].open]      
+        Dates  = asarray(self.data['date'])[self.testStr:self.testEnd]
+        Opens  = asarray(self.data['open'])[self.testStr:self.testEnd]
+        Shares = self.account.InitialCapital/Opens[0]
+        BaseEquity = Opens*Shares
         
-        p.line(self.data[self.testStr:self.testEnd].date, BaseEquity, color='#CAD8DE', legend='Buy and Hold')
-        p.line(self.data[self.testStr:self.testEnd].date, self.account.Equity, color='#49516F', legend='Strategy')
+        p.line(Dates, BaseEquity, color='#CAD8DE', legend='Buy and Hold')
+        p.line(Dates, self.account.Equity, color='#49516F', legend='Strategy')
         p.legend.location = "top_left"
-        show(p)
\ No newline at end of file
+        show(p)
+
+class Portfolio(Engine):
+    def __init__(self, features, trainStr, trainEnd, testStr, testEnd, buyThreshold=0.65, sellThreshold=0.65, continueTraining=False, retrainEvery=1, trainWindow=None):
+        Engine.__init__(self, features, trainStr, trainEnd, testStr, testEnd, buyThreshold, sellThreshold, continueTraining, retrainEvery, trainWindow)
+        self.symbols = None
+
+    def start(self, panel, capital, logic, model=None, cache=None, pipeline=None, checkpoint=None, **kwargs):
+        # panel maps each symbol to a DataFrame, all aligned on the same days
+        from pandas import DataFrame
+        if pipeline is not None: panel = {symbol: pipeline.apply(panel[symbol], self.features) for symbol in panel}
+        panel = {symbol: self.select(panel[symbol]) for symbol in panel}
+        self.symbols = list(panel)
+        frames = [panel[symbol] for symbol in self.symbols]
+        self.data = frames[0] # Dates are shared across the panel
+        self.panel = panel
+        profiler = self.profiler
+        profiler.reset()
+
+        # ====================== #
+        #    Initial Training    #
+        # ====================== #
+
+        if checkpoint is not None and checkpoint.exists():
+            # Resume with the model, buffers and account of the last checkpoint
+            with profiler.phase('checkpoint'): X, y, first, fitted = self.restore(*checkpoint.load())
+        else:
+            # One model pooled over every symbol's training days
+            with profiler.phase('extract'):
+                X = helpers.panel(frames, self.features, self.trainStr, self.trainEnd+1)
+                y = helpers.classify(helpers.movements(frames, self.trainStr+1, self.trainEnd+2))
+                X, y = X.reshape(-1, len(self.features)), y.ravel()
+
+            with profiler.phase('fit'): self.initialize(X, y, model, cache, **kwargs)
+            profiler.trained(0, len(y))
+
+            X, y, first = helpers.Buffer(X), helpers.Buffer(y), 0
+            fitted = len(y) if model is None else None # Rows of X up to fitted end with the model's training set
+
+            self.account = exchange.Account(capital)
+
+        # ====================== #
+        #         Testing        #
+        # ====================== #
+
+        with profiler.phase('extract'):
+            columns = ['open', 'close'] + [var for var in self.features if var not in ('open', 'close')]
+            bars    = helpers.panel(frames, columns, self.testStr, self.testEnd)
+            testX   = bars[:, :, [columns.index(var) for var in self.features]]
+            testY   = helpers.movements(frames, self.testStr+1, self.testEnd+1)
+            dates   = asarray(self.data['date'])[self.testStr:self.testEnd]
+        profiler.count('days', len(dates))
+
+        if not self.continueTraining:
+            # Frozen model, score every symbol and day in one batch
+            neg, pos = self.model.predictBatch(testX.reshape(-1, len(self.features)), profiler)
+            with profiler.phase('signal'): predictions, confidences = self.signals(neg.reshape(testY.shape), pos.reshape(testY.shape))
+
+        window = None if self.trainWindow is None else self.trainWindow*len(self.symbols) # Rows pool every symbol's day
+        for n in range(first, len(dates)):
+
+            if self.continueTraining:
+                neg, pos = self.model.predictBatch(testX[n], profiler)
+                with profiler.phase('signal'): prediction, confidence = self.signals(neg, pos)
+            else:
+                prediction, confidence = predictions[n], confidences[n]
+
+            # Update account variables
+            self.account.Date = dates[n]
+            with profiler.phase('totalValue'): self.account.Equity.append(self.account.TotalValue(dict(zip(self.symbols, bars[n, :, 1].tolist()))))
+
+            # Execute trading logic on every symbol's bar at once
+            with profiler.phase('extract'): rows = DataFrame(bars[n], index=self.symbols, columns=columns)
+            with profiler.phase('logic'): logic(self.account, rows, prediction, confidence)
+
+            # Cleanup empty positions
+            with profiler.phase('purge'): self.account.PurgePositions()
+
+            if self.continueTraining:
+                X.extend(testX[n])
+                y.extend(helpers.classify(testY[n]))
+
+                # Refit every retrainEvery days on at most trainWindow days of every symbol
+                if (n+1) % self.retrainEvery == 0:
+                    with profiler.phase('retrain'): self.model.fit(X.view(window), y.view(window))
+                    fitted = len(X)
+                    profiler.count('retrains')
+                    profiler.trained(n+1, len(self.model.yy))
+
+            if checkpoint is not None and checkpoint.due(n+1):
+                with profiler.phase('checkpoint'): checkpoint.save(*self.snapshot(X, y, n+1, fitted))
+                profiler.count('checkpoints')
+
+        if checkpoint is not None: checkpoint.clear() # Finished runs start over
+        profiler.flush()
+
+    def settings(self):
+        return Engine.settings(self) + (self.symbols,)
+
+    def prices(self, i):
+        return {symbol: self.panel[symbol].iloc[i]['close'] for symbol in self.symbols}
+
+    def holdStats(self):
+        # Equal weight buy and hold across the panel
+        changes = [helpers.change(self.panel[symbol].iloc[self.testStr]['open'], self.panel[symbol].iloc[self.testEnd]['close'])
+                   for symbol in self.symbols]
+        return round(sum(changes)/len(changes)*100, 2)
+
+    def strategyStats(self):
+        return round(helpers.change(self.account.InitialCapital, self.account.TotalValue(self.prices(self.testEnd)))*100, 2)
+
+    def summary(self):
+        return {'holdStats': self.holdStats(), 'strategyStats': self.strategyStats(),
+                'totalValue': self.account.TotalValue(self.prices(self.testEnd))}
+
+    def statistics(self):
+        print("------------- Statistics --------------\n")
+        print("Symbols      : {0}".format(len(self.symbols)))
+        print("Buy and Hold : {0}%".format(self.holdStats()))
+        print("Strategy     : {0}%".format(self.strategyStats()))
+        print("Trades       : {0}".format(len(self.account.OpenedTrades)+len(self.account.ClosedTrades)))
+        print("\n---------------------------------------\n")
@@ -1,25 +1,85 @@
-import copy
+from enum import Enum
+from numpy import empty, int8
+
+# Local imports
+from clairvoyant import helpers
+
+class Side(str, Enum):
+    # Position types, equal to the plain strings 'Long' and 'Short'
+    Long  = 'Long'
+    Short = 'Short'
+
+    def __str__(self):
+        return self.value
+
+Sides = (Side.Long, Side.Short)
 
 class OpenedTrade():
-    def __init__(self, Type, Date):
-        self.Type = Type
-        self.Date = Date    
+    __slots__ = ('Type', 'Date', 'Symbol')
+    Fields    = (('Type', int8), ('Date', object), ('Symbol', object))
+
+    def __init__(self, Type, Date, Symbol=None):
+        self.Type   = Side(Type)
+        self.Date   = Date
+        self.Symbol = Symbol
     def __str__(self):
         return "{0}\n{1}".format(self.Type, self.Date)
 
 class ClosedTrade(OpenedTrade):
-    def __init__(self, Type, Date, Shares, Entry, Exit):
-        super().__init__(Type, Date)
+    __slots__ = ('Shares', 'Entry', 'Exit')
+    Fields    = (('Type', int8), ('Date', object), ('Shares', float), ('Entry', float), ('Exit', float), ('Symbol', object))
+
+    def __init__(self, Type, Date, Shares, Entry, Exit, Symbol=None):
+        super().__init__(Type, Date, Symbol)
         self.Shares = float(Shares)
         self.Entry  = float(Entry)
         self.Exit   = float(Exit)
     def __str__(self):
         return "{0}\n{1}\n{2}\n{3}\n{4}".format(self.Type, self.Date, self.Shares, self.Entry, self.Exit)
 
+class Ledger():
+    # Trades stored column-wise in growable arrays, types coded as int8
+    # Reads like the list of trade objects it replaces
+    def __init__(self, Trade):
+        self.Trade   = Trade
+        self.Columns = {Field: helpers.Buffer(empty(0, dtype=Type)) for Field, Type in Trade.Fields}
+
+    def __len__(self):
+        return len(self.Columns['Type'])
+
+    def __getitem__(self, Index):
+        if isinstance(Index, slice):
+            return [self[i] for i in range(*Index.indices(len(self)))]
+        Values = [self.Columns[Field].view()[Index] for Field, Type in self.Trade.Fields]
+        Values[0] = Sides[Values[0]]
+        return self.Trade(*Values)
+
+    def __iter__(self):
+        for i in range(len(self)): yield self[i]
+
+    def Record(self, Type, *Values):
+        for (Field, _), Value in zip(self.Trade.Fields, (Sides.index(Side(Type)),)+Values):
+            self.Columns[Field].append(Value)
+
+    def append(self, Trade):
+        self.Record(*[getattr(Trade, Field) for Field, Type in self.Trade.Fields])
+
+    def Count(self, Type):
+        return int((self.Columns['Type'].view() == Sides.index(Side(Type))).sum())
+
+    def Frame(self):
+        from pandas import DataFrame
+        Frame = DataFrame({Field: self.Columns[Field].view() for Field, Type in self.Trade.Fields})
+        Frame['Type'] = [Sides[Code].value for Code in Frame['Type']]
+        return Frame
+
 class Position:
-    def __init__(self, No, EntryPrice, Shares, ExitPrice=0, StopLoss=0):
+    __slots__ = ('No', 'Symbol', 'EntryPrice', 'Shares', 'ExitPrice', 'StopLoss')
+    Type      = "None"
+
+    def __init__(self, No, EntryPrice, Shares, ExitPrice=0, StopLoss=0, Symbol=None):
         self.No         = No
-        self.Type       = "None"
+        self.Symbol     = Symbol
         self.EntryPrice = float(EntryPrice)
         self.Shares     = float(Shares)
         self.ExitPrice  = float(ExitPrice)
@@ -27,6 +87,7 @@ class Position:
     
     def Show(self):
         print("No. {0}".format(self.No))
+        if self.Symbol is not None: print("Symbol: {0}".format(self.Symbol))
         print("Type:   {0}".format(self.Type))
         print("Entry:  {0}".format(self.EntryPrice))
         print("Shares: {0}".format(self.Shares))
@@ -34,27 +95,32 @@ class Position:
         print("Stop:   {0}\n".format(self.StopLoss))
 
 class LongPosition(Position):
-    def __init__(self, No, EntryPrice, Shares, ExitPrice=0, StopLoss=0):
-        super().__init__(No, EntryPrice, Shares, ExitPrice, StopLoss)
-        self.Type = 'Long'
+    __slots__ = ()
+    Type      = Side.Long
+
+    def Value(self, CurrentPrice, Percent=1.0):
+        return self.Shares*Percent*CurrentPrice
 
     def Close(self, Percent, CurrentPrice):
-        Shares = self.Shares
+        Value = self.Value(CurrentPrice, Percent)
         self.Shares *= 1.0-Percent
-        return Shares*Percent*CurrentPrice
+        return Value
 
 class ShortPosition(Position):
-    def __init__(self, No, EntryPrice, Shares, ExitPrice=0, StopLoss=0):
-        super().__init__(No, EntryPrice, Shares, ExitPrice, StopLoss)
-        self.Type = 'Short' 
+    __slots__ = ()
+    Type      = Side.Short
 
-    def Close(self, Percent, CurrentPrice):
+    def Value(self, CurrentPrice, Percent=1.0):
         Entry = self.Shares*Percent*self.EntryPrice
         Exit = self.Shares*Percent*CurrentPrice
-        self.Shares *= 1.0-Percent
         if Entry-Exit+Entry <= 0: return 0
         else: return Entry-Exit+Entry
 
+    def Close(self, Percent, CurrentPrice):
+        Value = self.Value(CurrentPrice, Percent)
+        self.Shares *= 1.0-Percent
+        return Value
+
 class Account():
     def __init__(self, InitialCapital):
         self.InitialCapital = float(InitialCapital)
@@ -63,22 +129,24 @@ class Account():
         self.Date           = None
         self.Equity         = []
         self.Positions      = []
-        self.OpenedTrades   = []
-        self.ClosedTrades   = []
+        self.OpenedTrades   = Ledger(OpenedTrade)
+        self.ClosedTrades   = Ledger(ClosedTrade)
 
-    def EnterPosition(self, Type, EntryCapital, EntryPrice, ExitPrice=0, StopLoss=0):
+    def EnterPosition(self, Type, EntryCapital, EntryPrice, ExitPrice=0, StopLoss=0, Symbol=None):
         EntryCapital = float(EntryCapital)
         if EntryCapital < 0: raise ValueError("Error: Entry capital must be positive")          
         elif EntryPrice < 0: raise ValueError("Error: Entry price cannot be negative.")
         elif self.BuyingPower < EntryCapital: raise ValueError("Error: Not enough buying power to enter position")          
         else: 
+            if Type == 'Long': Position = LongPosition
+            elif Type == 'Short': Position = ShortPosition
+            else: raise TypeError("Error: Invalid position type.")
+
             self.BuyingPower -= EntryCapital
             Shares = EntryCapital/EntryPrice 
-            if Type == 'Long': self.Positions.append(LongPosition(self.No, EntryPrice, Shares, ExitPrice, StopLoss))
-            elif Type == 'Short': self.Positions.append(ShortPosition(self.No, EntryPrice, Shares, ExitPrice, StopLoss))    
-            else: raise TypeError("Error: Invalid position type.")
+            self.Positions.append(Position(self.No, EntryPrice, Shares, ExitPrice, StopLoss, Symbol))
 
-            self.OpenedTrades.append(OpenedTrade(Type, self.Date))
+            self.OpenedTrades.Record(Type, self.Date, Symbol)
             self.No += 1    
 
     def ClosePosition(self, Position, Percent, CurrentPrice):
@@ -87,7 +155,7 @@ class Account():
         elif CurrentPrice < 0:
             raise ValueError("Error: Current price cannot be negative.")                
         else: 
-            self.ClosedTrades.append(ClosedTrade(Position.Type, self.Date, Position.Shares*Percent, Position.EntryPrice, CurrentPrice))
+            self.ClosedTrades.Record(Position.Type, self.Date, Position.Shares*Percent, Position.EntryPrice, CurrentPrice, Position.Symbol)
             self.BuyingPower += Position.Close(Percent, CurrentPrice)
 
     def PurgePositions(self):
@@ -97,7 +165,13 @@ class Account():
         for p in self.Positions: p.Show()
 
     def TotalValue(self, CurrentPrice):
-        Temporary = copy.deepcopy(self)
-        for Position in Temporary.Positions:
-            Temporary.ClosePosition(Position, 1.0, CurrentPrice)
-        return Temporary.BuyingPower
\ No newline at end of file
+        # Mark to market as if every position were closed at CurrentPrice,
+        # either one price or prices looked up by each position's Symbol
+        Total = self.BuyingPower
+        for Position in self.Positions:
+            if Position.Symbol is not None: Price = CurrentPrice[Position.Symbol]
+            elif isinstance(CurrentPrice, dict): raise ValueError("Error: Positions valued by symbol must be entered with a Symbol.")
+            else: Price = CurrentPrice
+            if Price < 0: raise ValueError("Error: Current price cannot be negative.")
+            Total += Position.Value(Price)
+        return Total
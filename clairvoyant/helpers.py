@@ -1,5 +1,72 @@
+from numpy import asarray, column_stack, empty, stack, where
+
 def change(d1, d2):
     return (d2-d1)/d1
 
 def profit(capital, multiplier):
-    return capital*(multiplier+1.0)-capital
\ No newline at end of file
+    return capital*(multiplier+1.0)-capital
+
+def columns(data, names, start, stop):
+    # Materialize rows [start, stop) of the named columns as one 2D array
+    return column_stack([asarray(data[name])[start:stop] for name in names])
+
+def movement(data, start, stop):
+    # Open to close change of each day in [start, stop)
+    return change(asarray(data['open'])[start:stop], asarray(data['close'])[start:stop])
+
+def panel(frames, names, start, stop):
+    # Days x symbols x names array of rows [start, stop) from aligned frames
+    return stack([columns(data, names, start, stop) for data in frames], axis=1)
+
+def movements(frames, start, stop):
+    # Days x symbols open to close changes from aligned frames
+    return stack([movement(data, start, stop) for data in frames], axis=1)
+
+def classify(movements):
+    # If it went up, classify as 1 / If it went down, classify as -1
+    return where(movements > 0, 1, -1)
+
+class Buffer:
+    # Growable array with amortized O(1) appends
+    def __init__(self, values):
+        values = asarray(values)
+        self.size = len(values)
+        self.array = empty((max(2*self.size, 16),)+values.shape[1:], dtype=values.dtype)
+        self.array[:self.size] = values
+
+    def __len__(self):
+        return self.size
+
+    def __getstate__(self):
+        # Pickle only the filled rows, not the spare capacity
+        return self.view()
+
+    def __setstate__(self, values):
+        self.__init__(values)
+
+    def reserve(self, size):
+        if size > len(self.array):
+            array = empty((max(size, 2*len(self.array)),)+self.array.shape[1:], dtype=self.array.dtype)
+            array[:self.size] = self.array[:self.size]
+            self.array = array
+
+    def append(self, value):
+        self.reserve(self.size+1)
+        self.array[self.size] = value
+        self.size += 1
+
+    def extend(self, values):
+        self.reserve(self.size+len(values))
+        self.array[self.size:self.size+len(values)] = values
+        self.size += len(values)
+
+    def keep(self, window):
+        # Drop all but the most recent rows once they take up half the space
+        if self.size >= 2*window:
+            self.array[:window] = self.array[self.size-window:self.size]
+            self.size = window
+
+    def view(self, window=None):
+        # Most recent rows, at most window of them
+        start = 0 if window is None else max(0, self.size-window)
+        return self.array[start:self.size]
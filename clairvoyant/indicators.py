@@ -0,0 +1,99 @@
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Local imports
+from clairvoyant import dataset
+
+# Rolling indicators over one column. Each is vectorized, pandas rolling and
+# ewm windows update in O(1) per bar. The first bars are NaN until the
+# window fills, so start training after the longest window.
+
+def returns(x, n):
+    return x.pct_change(n)
+
+def sma(x, n):
+    return x.rolling(n).mean()
+
+def ema(x, n):
+    return x.ewm(span=n, adjust=False).mean()
+
+def volatility(x, n):
+    return x.pct_change().rolling(n).std()
+
+def rsi(x, n):
+    # Wilder's relative strength index
+    delta = x.diff()
+    gains = delta.clip(lower=0).ewm(alpha=1.0/n, adjust=False).mean()
+    losses = (-delta).clip(lower=0).ewm(alpha=1.0/n, adjust=False).mean()
+    return 100-100/(1+gains/losses)
+
+INDICATORS = {'returns': returns, 'sma': sma, 'ema': ema, 'volatility': volatility, 'rsi': rsi}
+
+def parse(name):
+    # <indicator>_<window>[_<column>], e.g. sma_20 or rsi_14_open
+    parts = name.split('_', 2)
+    if len(parts) < 2 or parts[0] not in INDICATORS or not parts[1].isdigit():
+        raise ValueError("Error: Unknown feature {0}".format(name))
+    return parts[0], int(parts[1]), parts[2] if len(parts) == 3 else 'close'
+
+class Pipeline:
+    # Computes the indicator features a run references, caching each result
+    # in memory and optionally as .npy files in path, keyed by the input
+    # column's contents and the indicator's parameters
+    def __init__(self, path=None):
+        self.path     = path
+        self.memory   = {}
+        self.computed = 0
+        if path is not None: os.makedirs(path, exist_ok=True)
+
+    def __getstate__(self):
+        # Worker processes get the settings and disk cache, not the memory
+        state = dict(self.__dict__)
+        state['memory'] = {}
+        return state
+
+    def digest(self, values):
+        values = np.ascontiguousarray(values)
+        digest = hashlib.sha256(values.tobytes())
+        digest.update(values.dtype.str.encode())
+        return digest.hexdigest()
+
+    def compute(self, data, name, digests=None):
+        indicator, window, column = parse(name)
+        values = np.asarray(data[column])
+        digests = {} if digests is None else digests
+        if column not in digests: digests[column] = self.digest(values)
+        key = hashlib.sha256(repr((digests[column], indicator, window)).encode()).hexdigest()
+
+        if key in self.memory:
+            return self.memory[key]
+        file = None if self.path is None else os.path.join(self.path, "{0}.npy".format(key))
+        if file is not None and os.path.exists(file):
+            result = np.load(file, mmap_mode='r')
+        else:
+            result = INDICATORS[indicator](pd.Series(values, dtype=float), window).to_numpy()
+            self.computed += 1
+            if file is not None:
+                # Write then rename so other processes never map a partial file
+                fd, temporary = tempfile.mkstemp(dir=self.path, suffix='.npy')
+                with os.fdopen(fd, 'wb') as f: np.save(f, result)
+                try: os.replace(temporary, file)
+                except OSError: os.remove(temporary) # Another process stored the same result first
+        self.memory[key] = result
+        return result
+
+    def apply(self, data, features):
+        # data with every referenced feature it lacks added as a column
+        missing = [name for name in features if name not in data.columns]
+        if not missing: return data
+        digests = {}
+        values = {name: self.compute(data, name, digests) for name in missing}
+        if isinstance(data, dataset.Dataset):
+            loaders = dict(data.loaders)
+            loaders.update({name: (lambda value=value: value) for name, value in values.items()})
+            return dataset.Dataset(loaders, data.files)
+        return data.assign(**values)
@@ -0,0 +1,221 @@
+import itertools
+import os
+import random
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Local imports
+from clairvoyant import indicators
+
+# Engine arguments, every other key of a search space is a Model argument
+ENGINE = ('features', 'buyThreshold', 'sellThreshold', 'continueTraining', 'retrainEvery', 'trainWindow')
+
+# Engine.start arguments, every other keyword of a search's start is a Model argument
+START = ('capital', 'logic', 'pipeline', 'cache', 'checkpoint')
+
+class SharedData:
+    # Columns saved once as .npy files that workers memory map, a Dataset
+    # shares only columns and reuses the .npy files it already maps
+    def __init__(self, data, columns=None):
+        self.path  = tempfile.mkdtemp(prefix='clairvoyant-')
+        self.files = {}
+        stored = getattr(data, 'files', {})
+        for n, column in enumerate(data.columns if columns is None else columns):
+            if column in stored:
+                self.files[column] = stored[column]
+                continue
+            values = np.asarray(data[column])
+            self.files[column] = os.path.join(self.path, "{0}.npy".format(n))
+            np.save(self.files[column], values, allow_pickle=values.dtype.hasobject)
+
+    def load(self):
+        columns = {}
+        for column, file in self.files.items():
+            try: columns[column] = np.load(file, mmap_mode='r')
+            except ValueError: columns[column] = np.load(file, allow_pickle=True) # Python objects can't be memory mapped
+        return pd.DataFrame(columns, copy=False)
+
+    def close(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def _columns(data, features):
+    # Columns runs over features read, only a Dataset is narrowed to them
+    if not hasattr(data, 'select'): return None
+    names = ['date', 'open', 'close']
+    for name in features:
+        names.append(name if name in data else indicators.parse(name)[2])
+    return [name for name in dict.fromkeys(names) if name in data]
+
+# Data attached once per worker process
+_data = None
+
+def _attach(shared):
+    global _data
+    _data = shared.load()
+
+def _run(Engine, windows, features, kwargs, configs, start):
+    # Fit one model for the group and reuse it for every configuration
+    model = Engine(features, *windows).train(_data, pipeline=start.get('pipeline'), **kwargs)
+    results = []
+    for config in configs:
+        engine = Engine(features, *windows, **config)
+        engine.start(_data, model=model, **start)
+        results.append(engine.summary())
+    return results
+
+def _fold(Engine, features, windows, options, start):
+    engine = Engine(features, *windows, **options)
+    engine.start(_data, **start)
+    equity = list(engine.account.Equity) if engine.account is not None else None
+    return engine.summary(), equity
+
+def execute(data, tasks, processes=None, columns=None):
+    # Run (function, args) tasks against data, in this process when processes
+    # is 1 or else in a pool whose workers memory map one shared copy of columns
+    global _data
+    if processes == 1:
+        _data = data
+        try: return [function(*args) for function, args in tasks]
+        finally: _data = None
+
+    with SharedData(data, columns) as shared:
+        with ProcessPoolExecutor(processes, initializer=_attach, initargs=(shared,)) as pool:
+            futures = [pool.submit(function, *args) for function, args in tasks]
+            return [future.result() for future in futures]
+
+class GridSearch:
+    def __init__(self, Engine, space, trainStr, trainEnd, testStr, testEnd):
+        if 'features' not in space:
+            raise ValueError("Error: Search space must include features")
+        self.Engine  = Engine
+        self.space   = space
+        self.windows = (trainStr, trainEnd, testStr, testEnd)
+
+    def configurations(self):
+        keys = sorted(self.space)
+        for values in itertools.product(*[self.space[key] for key in keys]):
+            yield dict(zip(keys, values))
+
+    def groups(self, configurations, defaults=None):
+        # Configurations sharing features and model arguments share a fitted model
+        groups = {}
+        for n, config in enumerate(configurations):
+            kwargs = dict(defaults or {})
+            kwargs.update({k: v for k, v in config.items() if k not in ENGINE})
+            key = repr((list(config['features']), sorted(kwargs.items())))
+            if key not in groups: groups[key] = (config['features'], kwargs, [], [])
+            groups[key][2].append({k: v for k, v in config.items() if k in ENGINE and k != 'features'})
+            groups[key][3].append(n)
+        return list(groups.values())
+
+    def start(self, data, processes=None, **kwargs):
+        configurations = list(self.configurations())
+        start = {k: v for k, v in kwargs.items() if k in START}
+        groups = self.groups(configurations, {k: v for k, v in kwargs.items() if k not in START})
+        results = [None]*len(configurations)
+
+        tasks = [(_run, (self.Engine, self.windows, features, model, configs, start))
+                 for features, model, configs, indices in groups]
+        shared = _columns(data, [name for features, model, configs, indices in groups for name in features])
+        for (features, model, configs, indices), group in zip(groups, execute(data, tasks, processes, shared)):
+            for n, result in zip(indices, group):
+                results[n] = result
+
+        table = pd.DataFrame(configurations)
+        table['features'] = [tuple(config['features']) for config in configurations]
+        return pd.concat([table, pd.DataFrame(results)], axis=1)
+
+class RandomSearch(GridSearch):
+    def __init__(self, Engine, space, trainStr, trainEnd, testStr, testEnd, iterations=10, seed=None):
+        GridSearch.__init__(self, Engine, space, trainStr, trainEnd, testStr, testEnd)
+        self.iterations = iterations
+        self.seed       = seed
+
+    def configurations(self):
+        # Values are either lists to choose from or distributions with rvs()
+        rng = random.Random(self.seed)
+        keys = sorted(self.space)
+        for i in range(self.iterations):
+            config = {}
+            for key in keys:
+                values = self.space[key]
+                if hasattr(values, 'rvs'): config[key] = values.rvs(random_state=rng.randrange(2**32))
+                else:                      config[key] = values[rng.randrange(len(values))]
+            yield config
+
+class WalkForward:
+    def __init__(self, Engine, features, train, test, step=None, expanding=False, first=0, **options):
+        # Rolling (or expanding) train windows of train days, each followed by
+        # test days, moved forward step days at a time (default test)
+        if step is not None and step < test:
+            raise ValueError("Error: Step must be at least test days so test windows don't overlap")
+        self.Engine    = Engine
+        self.features  = features
+        self.train     = train
+        self.test      = test
+        self.step      = step or test
+        self.expanding = expanding
+        self.first     = first
+        self.options   = options # Other Engine arguments, e.g. thresholds
+        self.results   = None
+        self.curves    = None
+        self.dates     = None
+        self.capital   = None
+
+    def folds(self, length):
+        # (trainStr, trainEnd, testStr, testEnd), runs read prices up to testEnd itself
+        k = 0
+        while True:
+            trainStr = self.first if self.expanding else self.first+k*self.step
+            trainEnd = self.first+self.train-1+k*self.step
+            testStr, testEnd = trainEnd+1, trainEnd+1+self.test
+            if testEnd >= length: return
+            yield trainStr, trainEnd, testStr, testEnd
+            k += 1
+
+    def start(self, data, processes=None, **kwargs):
+        folds = list(self.folds(len(data)))
+        if not folds:
+            raise ValueError("Error: Data is too short for a single fold")
+
+        tasks = [(_fold, (self.Engine, self.features, windows, self.options, kwargs)) for windows in folds]
+        outcomes = execute(data, tasks, processes, _columns(data, self.features))
+
+        table = pd.DataFrame(folds, columns=['trainStr', 'trainEnd', 'testStr', 'testEnd'])
+        self.results = pd.concat([table, pd.DataFrame([summary for summary, equity in outcomes])], axis=1)
+        self.curves = [equity for summary, equity in outcomes]
+        self.dates = [np.asarray(data['date'])[testStr:testEnd] for trainStr, trainEnd, testStr, testEnd in folds]
+        self.capital = kwargs.get('capital')
+        return self.results
+
+    def equity(self):
+        # Simulation equity curves chained so each fold starts where the last ended
+        if self.curves is None or self.curves[0] is None:
+            print("Error: Please start a Simulation walk forward to generate equity")
+            return
+        scale, stitched = 1.0, []
+        for curve, final in zip(self.curves, self.results['totalValue']):
+            stitched.append(np.asarray(curve)*scale)
+            scale *= final/self.capital
+        return pd.Series(np.concatenate(stitched), index=np.concatenate(self.dates), name='equity')
+
+    def summary(self):
+        # Pooled over every fold
+        r = self.results
+        if 'totalBuys' in r:
+            buys, sells = r['totalBuys'].sum(), r['totalSells'].sum()
+            return {'folds': len(r), 'totalBuys': int(buys), 'totalSells': int(sells),
+                    'buyStats': round(float(r['correctBuys'].sum())/buys*100, 2) if buys else float(0),
+                    'sellStats': round(float(r['correctSells'].sum())/sells*100, 2) if sells else float(0)}
+        growth = np.prod(r['totalValue']/self.capital)
+        return {'folds': len(r), 'strategyStats': round((growth-1)*100, 2), 'totalValue': self.capital*growth}
@@ -0,0 +1,94 @@
+import json
+from time import perf_counter
+
+class Phase:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name     = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+
+    def __exit__(self, *args):
+        timing = self.profiler.timings.setdefault(self.name, [0, 0.0])
+        timing[0] += 1
+        timing[1] += perf_counter()-self.start
+
+class Profiler:
+    # Per-phase timers and counters for one engine run, reported to sinks
+    enabled = True
+
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+        self.reset()
+
+    def reset(self):
+        self.timings  = {}
+        self.counters = {}
+        self.trainSizes = [] # (test day, training set size) at every fit
+
+    def phase(self, name):
+        return Phase(self, name)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0)+n
+
+    def trained(self, day, size):
+        self.trainSizes.append((day, size))
+
+    def report(self):
+        total = sum(seconds for calls, seconds in self.timings.values())
+        phases = {name: {'calls': calls, 'seconds': seconds, 'share': seconds/total if total else 0.0}
+                  for name, (calls, seconds) in self.timings.items()}
+        return {'phases': phases, 'counters': dict(self.counters), 'trainSizes': list(self.trainSizes)}
+
+    def flush(self):
+        report = self.report()
+        for sink in self.sinks: sink(report)
+
+class NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *args):
+        pass
+
+class NullProfiler:
+    # Stands in when instrumentation is off, every call does nothing
+    enabled = False
+    phaseless = NullPhase()
+
+    def reset(self):
+        pass
+
+    def phase(self, name):
+        return self.phaseless
+
+    def count(self, name, n=1):
+        pass
+
+    def trained(self, day, size):
+        pass
+
+    def report(self):
+        return None
+
+    def flush(self):
+        pass
+
+NULL = NullProfiler()
+
+class JSONSink:
+    # Writes each report to path, or appends one line per report
+    def __init__(self, path, append=False):
+        self.path   = path
+        self.append = append
+
+    def __call__(self, report):
+        with open(self.path, 'a' if self.append else 'w') as f:
+            json.dump(report, f)
+            f.write("\n")
@@ -0,0 +1,75 @@
+from abc import ABC, abstractmethod
+
+from numpy import empty, flatnonzero, searchsorted
+
+class Rule(ABC):
+    # Declarative trading logic, usable as a Simulation logic callback or,
+    # when the model is frozen, run over the whole test window at once
+    @abstractmethod
+    def __call__(self, account, row, prediction, confidence):
+        pass
+
+    @abstractmethod
+    def run(self, account, dates, close, predictions):
+        pass
+
+class LongRule(Rule):
+    # Go long with percent of buying power on a 1 when flat, close on a -1
+    # or when the close falls to stopLoss below the entry price
+    def __init__(self, percent=1.0, stopLoss=0):
+        if percent <= 0 or percent > 1: raise ValueError("Error: Percent must range between 0-1.")
+        self.percent  = percent
+        self.stopLoss = stopLoss
+
+    def stop(self, price):
+        return price*(1.0-self.stopLoss) if self.stopLoss else 0
+
+    def __call__(self, account, row, prediction, confidence):
+        price = row['close']
+        for p in account.Positions:
+            if p.Shares > 0 and p.StopLoss > 0 and price <= p.StopLoss:
+                account.ClosePosition(p, 1.0, price)
+        if prediction == -1:
+            for p in account.Positions:
+                if p.Shares > 0: account.ClosePosition(p, 1.0, price)
+        elif prediction == 1 and account.BuyingPower > 0:
+            if not any(p.Shares > 0 for p in account.Positions):
+                account.EnterPosition('Long', account.BuyingPower*self.percent, price, StopLoss=self.stop(price))
+
+    def run(self, account, dates, close, predictions):
+        # Steps from trade to trade with array searches, filling the equity
+        # curve a holding period at a time. Returns the equity curve.
+        days = len(close)
+        equity = empty(days)
+        buys, sells = flatnonzero(predictions == 1), flatnonzero(predictions == -1)
+        flat = search = 0
+
+        while True:
+            k = searchsorted(buys, search)
+            if k == len(buys) or account.BuyingPower <= 0:
+                equity[flat:] = account.BuyingPower
+                break
+
+            # Equity is marked before the day's trading
+            entry = buys[k]
+            equity[flat:entry+1] = account.BuyingPower
+            account.Date = dates[entry]
+            account.EnterPosition('Long', account.BuyingPower*self.percent, close[entry], StopLoss=self.stop(close[entry]))
+            p = account.Positions[-1]
+
+            k = searchsorted(sells, entry+1)
+            exit = sells[k] if k < len(sells) else days
+            if p.StopLoss > 0:
+                hits = flatnonzero(close[entry+1:exit] <= p.StopLoss)
+                if len(hits): exit = entry+1+hits[0]
+
+            equity[entry+1:exit+1] = account.BuyingPower+p.Shares*close[entry+1:exit+1]
+            if exit >= days: break
+
+            account.Date = dates[exit]
+            account.ClosePosition(p, 1.0, close[exit])
+            account.PurgePositions()
+            flat, search = exit+1, exit # A stopped out day can enter again
+
+        if days: account.Date = dates[-1]
+        return equity
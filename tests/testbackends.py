@@ -0,0 +1,37 @@
+import unittest
+
+# Local imports
+import sys
+sys.path.append("../.")
+sys.path.append("tests")
+from clairvoyant import backends, engine
+from testengine import market
+
+class Methods(unittest.TestCase):
+
+    def test_backends(self):
+        data = market()
+        for backend in sorted(backends.BACKENDS):
+            b = engine.Backtest(['a', 'b'], 0, 149, 150, 298, 0.5, 0.5)
+            b.start(data, backend=backend, random_state=0)
+            self.assertEqual(b.totalBuys+b.totalSells, 148, backend)
+            neg, pos = b.model.predict([0.1, 0.2])
+            self.assertAlmostEqual(neg+pos, 1.0)
+
+    def test_calibration(self):
+        data = market()
+        b = engine.Backtest(['a', 'b'], 0, 149, 150, 298, 0.5, 0.5)
+        b.start(data, calibration='sigmoid', folds=2, random_state=0)
+        self.assertFalse(b.model.estimator.estimator.probability)
+        self.assertEqual(len(b.model.decision([[0, 0], [1, 1]])), 2)
+
+    def test_instance(self):
+        from sklearn.linear_model import LogisticRegression
+        estimator = LogisticRegression(C=0.5)
+        b = engine.Backtest(['a', 'b'], 0, 149, 150, 298)
+        b.start(market(), backend=estimator)
+        self.assertIsNot(b.model.estimator, estimator)
+        self.assertRaises(ValueError, engine.Model, backend='unknown')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import shutil
+import tempfile
+import unittest
+
+# Local imports
+import sys
+sys.path.append("../.")
+sys.path.append("tests")
+from clairvoyant import engine
+from clairvoyant.cache import ModelCache
+from testengine import market
+
+class Methods(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_memory(self):
+        data, cache = market(), ModelCache(size=1)
+        a = engine.Backtest(['a', 'b'], 0, 99, 100, 150, 0.55, 0.55)
+        a.start(data, cache=cache, random_state=0)
+        b = engine.Backtest(['a', 'b'], 0, 99, 100, 150, 0.6, 0.6)
+        b.start(data, cache=cache, random_state=0)
+        self.assertIs(a.model, b.model)
+        self.assertEqual(cache.stats()['hits'], 1)
+        # Other arguments miss and evict the first model
+        c = engine.Backtest(['a', 'b'], 0, 99, 100, 150)
+        c.start(data, cache=cache, C=2.0, random_state=0)
+        self.assertIsNot(c.model, a.model)
+        c.start(data, cache=cache, random_state=0)
+        self.assertEqual(cache.stats()['misses'], 3)
+
+    def test_disk(self):
+        data = market()
+        a = engine.Backtest(['a', 'b'], 0, 99, 100, 150, 0.55, 0.55)
+        a.start(data, cache=ModelCache(path=self.path), random_state=0)
+        cache = ModelCache(path=self.path)
+        b = engine.Backtest(['a', 'b'], 0, 99, 100, 150, 0.55, 0.55)
+        b.start(data, cache=cache, random_state=0)
+        self.assertEqual(cache.stats()['loads'], 1)
+        self.assertEqual((a.totalBuys, a.correctBuys, a.totalSells), (b.totalBuys, b.correctBuys, b.totalSells))
+
+    def test_continue(self):
+        # Continued training refits a copy, never the cached model
+        data, cache = market(), ModelCache()
+        a = engine.Backtest(['a', 'b'], 0, 99, 100, 150, continueTraining=True)
+        a.start(data, cache=cache, random_state=0)
+        b = engine.Backtest(['a', 'b'], 0, 99, 100, 150)
+        b.start(data, cache=cache, random_state=0)
+        self.assertEqual(len(b.model.yy), 100)
+        self.assertEqual(len(a.model.yy), 150)
+
+if __name__ == '__main__':
+    unittest.main()
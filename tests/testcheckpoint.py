@@ -0,0 +1,123 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+# Local imports
+import sys
+sys.path.append("../.")
+sys.path.append("tests")
+from clairvoyant import engine, helpers
+from clairvoyant.checkpoint import Checkpoint
+from testengine import market, logic
+
+class Interrupt(Exception):
+    pass
+
+def interrupted(after):
+    # Trading logic that stops the run on its after-th bar
+    calls = []
+    def stop(account, row, prediction, confidence):
+        calls.append(1)
+        if len(calls) > after: raise Interrupt()
+        logic(account, row, prediction, confidence)
+    return stop
+
+class Methods(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.run = os.path.join(self.path, 'run')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def simulation(self):
+        return engine.Simulation(['a', 'b'], 0, 149, 150, 250, 0.55, 0.55, continueTraining=True, retrainEvery=10)
+
+    def test_resume(self):
+        data = market()
+        full = self.simulation()
+        full.start(data, 1000, logic, random_state=0)
+
+        first = self.simulation()
+        with self.assertRaises(Interrupt):
+            first.start(data, 1000, interrupted(45), checkpoint=Checkpoint(self.run, every=20), random_state=0)
+        self.assertTrue(os.path.exists(self.run))
+
+        resumed, checkpoint = self.simulation(), Checkpoint(self.run, every=20)
+        resumed.start(data, 1000, logic, checkpoint=checkpoint, random_state=0)
+        self.assertEqual(resumed.account.Equity, full.account.Equity)
+        self.assertTrue(resumed.account.ClosedTrades.Frame().equals(full.account.ClosedTrades.Frame()))
+        self.assertEqual(checkpoint.saves, 3) # Days 60, 80 and 100
+        self.assertFalse(checkpoint.exists())
+
+    def test_backtest(self):
+        data = market()
+        full = engine.Backtest(['a', 'b'], 0, 149, 150, 250, 0.55, 0.55, continueTraining=True)
+        full.start(data, random_state=0)
+
+        class Keep(Checkpoint):
+            def clear(self): pass # Leave the day 90 checkpoint behind
+
+        Backtest = lambda: engine.Backtest(['a', 'b'], 0, 149, 150, 250, 0.55, 0.55, continueTraining=True)
+        Backtest().start(data, checkpoint=Keep(self.run, every=30), random_state=0)
+        state, streams = Checkpoint(self.run).load()
+        self.assertEqual(state['first'], 90)
+        self.assertEqual(len(streams['X']), 150+90)
+
+        # Saved state is only resumed by an identically configured engine
+        other = engine.Backtest(['a', 'b'], 0, 149, 150, 200, 0.55, 0.55, continueTraining=True)
+        with self.assertRaises(ValueError):
+            other.start(data, checkpoint=Checkpoint(self.run), random_state=0)
+
+        resumed = Backtest()
+        resumed.start(data, checkpoint=Checkpoint(self.run), random_state=0)
+        self.assertEqual(resumed.summary(), full.summary())
+        self.assertTrue(np.array_equal(resumed.model.XX, full.model.XX))
+
+    def test_increments(self):
+        # Saves append only the bars since the last one, so their size stays
+        # flat however long the history grows, and an interrupted append is
+        # dropped on the next load
+        sizes = []
+        class Sizes(Checkpoint):
+            def save(self, state, streams):
+                Checkpoint.save(self, state, streams)
+                sizes.append(self.written)
+            def clear(self): pass
+        data = market(1000)
+        s = engine.Simulation(['a', 'b'], 0, 149, 150, 998, 0.5, 0.5, continueTraining=True)
+        s.start(data, 1000, logic, checkpoint=Sizes(self.run, every=50), backend='logistic', random_state=0)
+        self.assertEqual(len(sizes), 16)
+        self.assertLess(max(sizes[1:]), 2*min(sizes[1:]))
+        self.assertLess(max(sizes[1:]), sizes[0])
+
+        with open(os.path.join(self.run, 'X.pkl'), 'ab') as f: f.write(b'partial')
+        checkpoint = Checkpoint(self.run)
+        state, streams = checkpoint.load()
+        self.assertEqual(len(streams['X']), 150+800)
+        self.assertEqual(streams['Equity'], s.account.Equity[:800])
+        checkpoint.save(*s.snapshot(helpers.Buffer(streams['X']), helpers.Buffer(streams['y']), 800, None))
+        self.assertEqual(len(checkpoint.load()[1]['X']), 150+800)
+
+    def test_clear(self):
+        # A finished run removes its own files, not the directory's others
+        os.makedirs(self.run)
+        with open(os.path.join(self.run, 'results.csv'), 'w') as f: f.write('kept')
+        checkpoint = Checkpoint(self.run, every=20)
+        self.simulation().start(market(), 1000, logic, checkpoint=checkpoint, random_state=0)
+        self.assertEqual(checkpoint.saves, 5)
+        self.assertEqual(os.listdir(self.run), ['results.csv'])
+        # An emptied directory goes too
+        os.remove(os.path.join(self.run, 'results.csv'))
+        self.simulation().start(market(), 1000, logic, checkpoint=Checkpoint(self.run, every=20), random_state=0)
+        self.assertFalse(os.path.exists(self.run))
+
+    def test_every(self):
+        with self.assertRaises(ValueError):
+            Checkpoint(self.run, every=0)
+
+if __name__ == '__main__':
+    unittest.main()
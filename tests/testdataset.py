@@ -0,0 +1,66 @@
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+# Local imports
+import sys
+sys.path.append("../.")
+sys.path.append("tests")
+from clairvoyant import dataset, engine
+from testengine import market, logic
+
+class Methods(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_numpy(self):
+        data = market()
+        data['unused'] = 0.0
+        dataset.toNumpy(data, self.path)
+        d = dataset.fromNumpy(self.path, columns=['date', 'open', 'close', 'a', 'b'])
+        self.assertIsInstance(d['a'], np.memmap)
+        self.assertEqual(len(d), len(data))
+        self.assertNotIn('unused', d)
+        # Only the columns an engine touches are mapped
+        a = engine.Backtest(['a', 'b'], 0, 99, 100, 150, 0.55, 0.55)
+        a.start(d, random_state=0)
+        self.assertEqual(sorted(d.arrays), ['a', 'b', 'close', 'open'])
+        b = engine.Backtest(['a', 'b'], 0, 99, 100, 150, 0.55, 0.55)
+        b.start(data, random_state=0)
+        self.assertEqual(a.summary(), b.summary())
+        self.assertEqual(d.iloc[5]['close'], data.iloc[5]['close'])
+
+    def test_simulation(self):
+        data = market()
+        data['unused'] = 0.0
+        dataset.toNumpy(data, self.path)
+        d = dataset.fromNumpy(self.path)
+        a = engine.Simulation(['a', 'b'], 0, 99, 100, 150, 0.5, 0.5)
+        a.start(d, 1000, logic, random_state=0)
+        self.assertEqual(sorted(d.arrays), ['a', 'b', 'close', 'date', 'open'])
+        self.assertNotIn('unused', a.data.iloc[5])
+        b = engine.Simulation(['a', 'b'], 0, 99, 100, 150, 0.5, 0.5)
+        b.start(data, 1000, logic, random_state=0)
+        self.assertEqual(a.account.Equity, b.account.Equity)
+        self.assertEqual(a.summary(), b.summary())
+
+    def test_arrow(self):
+        try: import pyarrow as pa, pyarrow.parquet as pq
+        except ImportError: self.skipTest("pyarrow is not installed")
+        data = market()
+        table = pa.Table.from_pandas(data, preserve_index=False)
+        pq.write_table(table, self.path+'/data.parquet')
+        with pa.OSFile(self.path+'/data.arrow', 'wb') as f:
+            with pa.ipc.new_file(f, table.schema) as writer: writer.write_table(table)
+        for d in (dataset.fromParquet(self.path+'/data.parquet'), dataset.fromArrow(self.path+'/data.arrow')):
+            self.assertEqual(d.columns, list(data.columns))
+            self.assertTrue(np.array_equal(d['a'], data['a']))
+            self.assertEqual(list(d.arrays), ['a'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+# Local imports
+import sys
+sys.path.append("../.")
+from clairvoyant import engine, helpers
+
+def market(n=300, seed=0):
+    rng = np.random.RandomState(seed)
+    close = 100*np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({'date':  pd.date_range('2000-01-01', periods=n),
+                         'open':  close*(1+rng.normal(0, 0.005, n)),
+                         'close': close,
+                         'a':     rng.normal(size=n),
+                         'b':     rng.normal(size=n)})
+
+def logic(account, row, prediction, confidence):
+    if prediction == 1 and account.BuyingPower > 0:
+        account.EnterPosition('Long', account.BuyingPower*0.5, row['close'])
+    elif prediction == -1:
+        for p in account.Positions: account.ClosePosition(p, 1.0, row['close'])
+
+class Methods(unittest.TestCase):
+
+    def test_extraction(self):
+        data = market()
+        X = helpers.columns(data, ['a', 'b'], 10, 50)
+        y = helpers.classify(helpers.movement(data, 11, 51))
+        for n, i in enumerate(range(10, 50)):
+            self.assertEqual(list(X[n]), [data.iloc[i][var] for var in ['a', 'b']])
+            y1 = helpers.change(data.iloc[i+1].open, data.iloc[i+1].close)
+            self.assertEqual(y[n], 1 if y1 > 0 else -1)
+
+    def test_continue(self):
+        data = market()
+        b = engine.Backtest(['a', 'b'], 0, 99, 100, 150, 0.5, 0.5, continueTraining=True)
+        b.start(data, random_state=0)
+        self.assertEqual(len(b.model.yy), 150)
+        self.assertEqual(b.totalBuys+b.totalSells, 50)
+
+    def test_batched(self):
+        data = market()
+        b = engine.Backtest(['a', 'b'], 0, 149, 150, 298, 0.55, 0.55)
+        b.start(data, random_state=0)
+        counts = [0, 0, 0, 0]
+        for i in range(150, 298):
+            prediction, confidence = b.signal(*b.model.predict([data.iloc[i].a, data.iloc[i].b]))
+            y1 = helpers.change(data.iloc[i+1].open, data.iloc[i+1].close)
+            if prediction == 1:
+                counts[0] += 1
+                counts[1] += y1 > 0
+            elif prediction == -1:
+                counts[2] += 1
+                counts[3] += y1 < 0
+        self.assertEqual([b.totalBuys, b.correctBuys, b.totalSells, b.correctSells], counts)
+
+    def test_portfolio(self):
+        panel = {'A': market(seed=0), 'B': market(seed=1), 'C': market(seed=2)}
+        def basket(account, rows, prediction, confidence):
+            for p in account.Positions:
+                if prediction[rows.index.get_loc(p.Symbol)] == -1:
+                    account.ClosePosition(p, 1.0, rows.close[p.Symbol])
+            for symbol in rows.index[prediction == 1]:
+                if account.BuyingPower > 1: account.EnterPosition('Long', account.BuyingPower*0.2, rows.close[symbol], Symbol=symbol)
+        p = engine.Portfolio(['a', 'b'], 0, 99, 100, 150, 0.5, 0.5)
+        p.start(panel, 1000, basket, random_state=0)
+        self.assertEqual(len(p.account.Equity), 50)
+        self.assertTrue(set(T.Symbol for T in p.account.OpenedTrades) <= set(panel))
+        q = engine.Portfolio(['a', 'b'], 0, 99, 100, 150, 0.5, 0.5, continueTraining=True, retrainEvery=25)
+        q.start(panel, 1000, basket, random_state=0)
+        self.assertEqual(len(q.model.yy), 3*150)
+        # trainWindow counts days, each holding a row per symbol
+        r = engine.Portfolio(['a', 'b'], 0, 99, 100, 150, 0.5, 0.5, continueTraining=True, retrainEvery=25, trainWindow=60)
+        r.start(panel, 1000, basket, random_state=0)
+        self.assertEqual(len(r.model.yy), 3*60)
+
+    def test_single(self):
+        # A one symbol portfolio reproduces the Simulation
+        data = market()
+        s = engine.Simulation(['a', 'b'], 0, 149, 150, 298, 0.5, 0.5)
+        s.start(data, 1000, logic, random_state=0)
+        def single(account, rows, prediction, confidence):
+            if prediction[0] == 1 and account.BuyingPower > 0:
+                account.EnterPosition('Long', account.BuyingPower*0.5, rows.close['A'], Symbol='A')
+            elif prediction[0] == -1:
+                for p in account.Positions: account.ClosePosition(p, 1.0, rows.close['A'])
+        p = engine.Portfolio(['a', 'b'], 0, 149, 150, 298, 0.5, 0.5)
+        p.start({'A': data}, 1000, single, random_state=0)
+        self.assertEqual(p.account.Equity, s.account.Equity)
+        self.assertEqual(p.strategyStats(), s.strategyStats())
+        # Positions without a Symbol can't be valued against the panel
+        unnamed = lambda account, rows, prediction, confidence: logic(account, rows.iloc[0], prediction[0], confidence[0])
+        self.assertRaises(ValueError, engine.Portfolio(['a', 'b'], 0, 149, 150, 298, 0.5, 0.5).start, {'A': data}, 1000, unnamed, random_state=0)
+
+    def test_stream(self):
+        # Replaying testStr..testEnd through onBar matches the batch counters
+        data = market()
+        for continueTraining in (False, True):
+            a = engine.Backtest(['a', 'b'], 0, 99, 100, 160, 0.55, 0.55, continueTraining, retrainEvery=7, trainWindow=80)
+            a.start(data, random_state=0)
+            b = engine.Backtest(['a', 'b'], 0, 99, 100, 160, 0.55, 0.55, continueTraining, retrainEvery=7, trainWindow=80)
+            b.prepare(data, random_state=0)
+            signals = list(b.stream(data.iloc[i] for i in range(100, 161)))
+            self.assertEqual(len(signals), 61)
+            self.assertEqual(b.latencies()['bars'], 61)
+            self.assertEqual(b.summary(), a.summary())
+
+    def test_stream_simulation(self):
+        # Simulated days testStr..testEnd-1 match start
+        data = market()
+        a = engine.Simulation(['a', 'b'], 0, 99, 100, 160, 0.5, 0.5, continueTraining=True, retrainEvery=5)
+        a.start(data, 1000, logic, random_state=0)
+        b = engine.Simulation(['a', 'b'], 0, 99, 100, 160, 0.5, 0.5, continueTraining=True, retrainEvery=5)
+        b.prepare(data, 1000, logic, random_state=0)
+        for i in range(100, 160): b.onBar(data.iloc[i])
+        self.assertEqual(b.account.Equity, a.account.Equity)
+        self.assertEqual(b.account.BuyingPower, a.account.BuyingPower)
+
+    def test_visualize(self):
+        import os, tempfile
+        b = engine.Backtest(['a', 'b'], 0, 199, 200, 250)
+        b.start(market(), random_state=0)
+        before = b.model.predictBatch(np.eye(2))[1]
+        path = os.path.join(tempfile.mkdtemp(), 'boundary')
+        b.visualize(path, stepsize=1e-6, resolution=50, points=20, chunk=100)
+        self.assertTrue(os.path.exists(path+'.png'))
+        self.assertTrue(np.array_equal(b.model.predictBatch(np.eye(2))[1], before))
+
+    def test_retraining(self):
+        data = market()
+        b = engine.Backtest(['a', 'b'], 0, 99, 100, 150, 0.5, 0.5, continueTraining=True, retrainEvery=20, trainWindow=60)
+        b.start(data, random_state=0)
+        self.assertEqual(len(b.model.yy), 60)
+        self.assertEqual(list(b.model.yy), list(helpers.classify(helpers.movement(data, 81, 141))))
+
+    def test_buffer(self):
+        buf = helpers.Buffer(np.zeros((3, 2)))
+        for i in range(40): buf.append([i, i])
+        self.assertEqual(len(buf), 43)
+        self.assertEqual(buf.view(2).tolist(), [[38, 38], [39, 39]])
+        self.assertEqual(len(buf.view()), 43)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -102,5 +102,45 @@ class Methods(unittest.TestCase):
         a.ClosePosition(a.Positions[0], 1, 0.00000001)
         self.assertEqual(a.BuyingPower, 2.5)
 
+    def test_value(self):
+        a = exchange.Account(1000)
+        a.EnterPosition('Long',  500, 10)
+        a.EnterPosition('Short', 500, 10)
+        # Short value is floored at zero once price more than doubles
+        self.assertEqual(a.TotalValue(30), 1500)
+        self.assertEqual(a.TotalValue(20), 1000)
+        self.assertRaises(ValueError, a.TotalValue, -1)
+        # Valuation leaves the account untouched
+        self.assertEqual(a.BuyingPower, 0)
+        self.assertEqual([p.Shares for p in a.Positions], [50, 50])
+        self.assertEqual(len(a.ClosedTrades), 0)
+
+    def test_ledger(self):
+        a = exchange.Account(1000)
+        a.Date = 'D1'
+        a.EnterPosition('Long',  500, 10)
+        a.EnterPosition('Short', 250, 10, Symbol='S')
+        a.Date = 'D2'
+        a.ClosePosition(a.Positions[0], 0.5, 20)
+        a.ClosePosition(a.Positions[1], 1.0, 5)
+        self.assertEqual(len(a.OpenedTrades), 2)
+        self.assertEqual([T.Type for T in a.OpenedTrades], ['Long', 'Short'])
+        self.assertEqual(a.OpenedTrades[-1].Symbol, 'S')
+        self.assertEqual(a.ClosedTrades.Count('Long'), 1)
+        self.assertEqual(a.ClosedTrades.Count('Short'), 1)
+        T = a.ClosedTrades[0]
+        self.assertEqual((T.Type, T.Date, T.Shares, T.Entry, T.Exit), ('Long', 'D2', 25, 10, 20))
+        Frame = a.ClosedTrades.Frame()
+        self.assertEqual(list(Frame.Type), ['Long', 'Short'])
+        self.assertEqual(list(Frame.Shares), [25, 25])
+        # Only the emptied short is purged
+        a.PurgePositions()
+        self.assertEqual([p.Type for p in a.Positions], ['Long'])
+        self.assertRaises(AttributeError, setattr, a.Positions[0], 'Note', 1)
+        # Positions emptied without ClosePosition are purged too
+        a.Positions[0].Close(1.0, 20)
+        a.PurgePositions()
+        self.assertEqual(a.Positions, [])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
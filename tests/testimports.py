@@ -0,0 +1,24 @@
+import os
+import subprocess
+import unittest
+
+# Local imports
+import sys
+sys.path.append("../.")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ('sklearn', 'pandas', 'matplotlib', 'bokeh', 'scipy')
+
+def loaded(module):
+    # Heavy packages present after importing module in a fresh interpreter
+    code = "import sys, {0}; print(','.join(m for m in {1} if m in sys.modules))".format(module, HEAVY)
+    return subprocess.check_output([sys.executable, '-c', code], cwd=ROOT).decode().strip()
+
+class Methods(unittest.TestCase):
+
+    def test_headless(self):
+        for module in ('clairvoyant.engine', 'clairvoyant.exchange', 'clairvoyant.backends', 'clairvoyant.rules'):
+            self.assertEqual(loaded(module), '', module)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+# Local imports
+import sys
+sys.path.append("../.")
+sys.path.append("tests")
+from clairvoyant import dataset, engine, indicators, parallel
+from testengine import market
+
+def compute(path, barrier, results):
+    # Start together so the workers race on the same cache file
+    data = market(200000)
+    barrier.wait()
+    try: results.put(float(np.nansum(indicators.Pipeline(path).compute(data, 'sma_50'))))
+    except Exception as e: results.put(repr(e))
+
+class Methods(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_values(self):
+        data = market()
+        close = data.close.values
+        p = indicators.Pipeline()
+        self.assertTrue(np.allclose(p.compute(data, 'sma_5')[4:], [close[i-4:i+1].mean() for i in range(4, len(close))]))
+        self.assertTrue(np.isnan(p.compute(data, 'sma_5')[3]))
+        self.assertAlmostEqual(p.compute(data, 'returns_2_open')[10], data.open[10]/data.open[8]-1)
+        rsi = p.compute(data, 'rsi_14')
+        self.assertTrue(((rsi[1:] >= 0) & (rsi[1:] <= 100)).all())
+        self.assertRaises(ValueError, p.compute, data, 'median_5')
+        self.assertRaises(ValueError, p.compute, data, 'sma_x')
+
+    def test_cache(self):
+        data = market()
+        p = indicators.Pipeline(self.path)
+        result = p.apply(data, ['a', 'sma_5', 'ema_10'])
+        self.assertEqual(list(result.columns[-2:]), ['sma_5', 'ema_10'])
+        self.assertNotIn('sma_5', data.columns)
+        self.assertEqual(p.computed, 2)
+        # A fresh pipeline reads the disk cache, changed data misses it
+        q = indicators.Pipeline(self.path)
+        self.assertTrue(np.array_equal(q.apply(data, ['sma_5']).sma_5, result.sma_5, equal_nan=True))
+        self.assertEqual(q.computed, 0)
+        data.loc[0, 'close'] += 1
+        q.apply(data, ['sma_5'])
+        self.assertEqual(q.computed, 1)
+
+    def test_shared(self):
+        # Processes filling one disk cache at once all get the same result
+        import multiprocessing
+        barrier, results = multiprocessing.Barrier(8), multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=compute, args=(self.path, barrier, results)) for i in range(8)]
+        for w in workers: w.start()
+        sums = [results.get() for w in workers]
+        for w in workers: w.join()
+        self.assertEqual(len(set(sums)), 1, sums)
+        self.assertEqual(len(os.listdir(self.path)), 1)
+
+    def test_engine(self):
+        data = market()
+        p = indicators.Pipeline()
+        a = engine.Backtest(['sma_5', 'rsi_14'], 20, 119, 120, 170, 0.55, 0.55)
+        a.start(data, pipeline=p, random_state=0)
+        b = engine.Backtest(['sma_5', 'rsi_14'], 20, 119, 120, 170, 0.55, 0.55)
+        b.start(p.apply(data, ['sma_5', 'rsi_14']), random_state=0)
+        self.assertEqual(a.summary(), b.summary())
+        # Streamed bars must carry their indicators already
+        c = engine.Backtest(['sma_5', 'rsi_14'], 20, 119, 120, 170, 0.55, 0.55)
+        self.assertRaises(ValueError, c.prepare, data, pipeline=p, random_state=0)
+        full = p.apply(data, ['sma_5', 'rsi_14'])
+        c.prepare(full, random_state=0)
+        for signal in c.stream(full.iloc[i] for i in range(120, 171)): pass
+        self.assertEqual(c.summary(), a.summary())
+        # Datasets gain the indicators as extra columns
+        dataset.toNumpy(data, self.path)
+        d = p.apply(dataset.fromNumpy(self.path), ['sma_5'])
+        self.assertTrue(np.array_equal(d['sma_5'], p.compute(data, 'sma_5'), equal_nan=True))
+
+    def test_search(self):
+        data = market()
+        space = {'features': [['sma_5', 'rsi_14'], ['a', 'ema_10']], 'random_state': [0]}
+        search = parallel.GridSearch(engine.Backtest, space, 20, 119, 120, 170)
+        results = search.start(data, processes=2, pipeline=indicators.Pipeline(self.path))
+        b = engine.Backtest(['sma_5', 'rsi_14'], 20, 119, 120, 170)
+        b.start(data, pipeline=indicators.Pipeline(), random_state=0)
+        self.assertEqual(results.totalBuys[0], b.totalBuys)
+        self.assertTrue(results.equals(search.start(data, processes=1, pipeline=indicators.Pipeline(self.path))))
+
+if __name__ == '__main__':
+    unittest.main()
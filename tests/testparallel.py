@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+# Local imports
+import sys
+sys.path.append("../.")
+sys.path.append("tests")
+from clairvoyant import dataset, engine, parallel
+from testengine import market, logic
+
+class Methods(unittest.TestCase):
+
+    def test_grid(self):
+        data = market()
+        space = {'features': [['a'], ['a', 'b']], 'buyThreshold': [0.5, 0.6], 'C': [1.0], 'random_state': [0]}
+        search = parallel.GridSearch(engine.Backtest, space, 0, 149, 150, 298)
+        results = search.start(data, processes=2)
+        self.assertEqual(len(results), 4)
+        self.assertTrue(results.equals(search.start(data, processes=1)))
+        # Matches an individual run
+        b = engine.Backtest(['a', 'b'], 0, 149, 150, 298, buyThreshold=0.6)
+        b.start(data, C=1.0, random_state=0)
+        row = results[(results.features == ('a', 'b')) & (results.buyThreshold == 0.6)].iloc[0]
+        self.assertEqual((row.totalBuys, row.buyStats, row.sellStats), (b.totalBuys, b.buyStats(), b.sellStats()))
+
+    def test_model(self):
+        # Model arguments given to start reach every fitted model
+        data = market()
+        space = {'features': [['a', 'b']], 'buyThreshold': [0.5, 0.6]}
+        search = parallel.GridSearch(engine.Backtest, space, 0, 149, 150, 298)
+        results = search.start(data, processes=1, backend='logistic', C=0.5)
+        b = engine.Backtest(['a', 'b'], 0, 149, 150, 298, buyThreshold=0.5)
+        b.start(data, backend='logistic', C=0.5)
+        self.assertEqual((results.totalBuys[0], results.totalSells[0]), (b.totalBuys, b.totalSells))
+        self.assertFalse(results.equals(search.start(data, processes=1, random_state=0)))
+
+    def test_random(self):
+        data = market()
+        space = {'features': [['a', 'b']], 'sellThreshold': [0.5, 0.55, 0.6], 'random_state': [0]}
+        search = parallel.RandomSearch(engine.Simulation, space, 0, 149, 150, 298, iterations=3, seed=1)
+        results = search.start(data, processes=2, capital=1000, logic=logic)
+        self.assertEqual(len(results), 3)
+        self.assertEqual(list(results.columns[-3:]), ['holdStats', 'strategyStats', 'totalValue'])
+
+    def test_folds(self):
+        w = parallel.WalkForward(engine.Backtest, ['a'], train=100, test=50)
+        self.assertEqual(list(w.folds(300)), [(0, 99, 100, 150), (50, 149, 150, 200), (100, 199, 200, 250)])
+        w = parallel.WalkForward(engine.Backtest, ['a'], train=100, test=50, step=100, expanding=True)
+        self.assertEqual(list(w.folds(300)), [(0, 99, 100, 150), (0, 199, 200, 250)])
+        # The last fold may test up to the final bar
+        w = parallel.WalkForward(engine.Simulation, ['a', 'b'], train=100, test=50)
+        self.assertEqual(len(list(w.folds(250))), 2)
+        self.assertEqual(list(w.folds(251))[-1], (100, 199, 200, 250))
+        w.start(market(251), processes=1, capital=1000, logic=logic, random_state=0)
+        self.assertEqual(len(w.results), 3)
+
+    def test_overlap(self):
+        # Overlapping test windows would repeat days in the stitched equity
+        self.assertRaises(ValueError, parallel.WalkForward, engine.Simulation, ['a'], train=100, test=50, step=25)
+
+    def test_walkforward(self):
+        data = market()
+        w = parallel.WalkForward(engine.Backtest, ['a', 'b'], train=100, test=50, buyThreshold=0.55)
+        results = w.start(data, processes=2, random_state=0)
+        self.assertEqual(len(results), 3)
+        b = engine.Backtest(['a', 'b'], 50, 149, 150, 200, buyThreshold=0.55)
+        b.start(data, random_state=0)
+        self.assertEqual(results.iloc[1].totalBuys, b.totalBuys)
+        self.assertEqual(w.summary()['totalBuys'], results.totalBuys.sum())
+
+    def test_equity(self):
+        data = market()
+        w = parallel.WalkForward(engine.Simulation, ['a', 'b'], train=100, test=50, buyThreshold=0.5, sellThreshold=0.5)
+        w.start(data, processes=1, capital=1000, logic=logic, random_state=0)
+        equity = w.equity()
+        self.assertEqual(len(equity), 150)
+        self.assertEqual(equity.index[50], data.date[150])
+        self.assertAlmostEqual(equity.iloc[50], w.results.totalValue[0])
+        self.assertAlmostEqual(w.summary()['totalValue'], float(np.prod(w.results.totalValue/1000)*1000))
+
+    def test_dataset(self):
+        data, path = market(), tempfile.mkdtemp()
+        data['unused'] = 0.0
+        try:
+            dataset.toNumpy(data, path)
+            d = dataset.fromNumpy(path)
+            # Only the columns runs read are shared, from the files already on disk
+            with parallel.SharedData(d, parallel._columns(d, ['a', 'sma_5_open'])) as shared:
+                self.assertEqual(list(shared.files), ['date', 'open', 'close', 'a'])
+                self.assertEqual(shared.files['a'], os.path.join(path, 'a.npy'))
+                self.assertEqual(os.listdir(shared.path), [])
+                self.assertTrue(np.array_equal(shared.load().close, data.close))
+            self.assertTrue(os.path.exists(os.path.join(path, 'a.npy')))
+            space = {'features': [['a', 'b']], 'buyThreshold': [0.5, 0.6], 'random_state': [0]}
+            search = parallel.GridSearch(engine.Backtest, space, 0, 149, 150, 298)
+            self.assertTrue(search.start(d, processes=2).equals(search.start(data, processes=1)))
+        finally:
+            shutil.rmtree(path)
+
+    def test_space(self):
+        self.assertRaises(ValueError, parallel.GridSearch, engine.Backtest, {'C': [1]}, 0, 1, 2, 3)
+
+if __name__ == '__main__':
+    unittest.main()
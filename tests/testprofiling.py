@@ -0,0 +1,60 @@
+import json
+import os
+import tempfile
+import unittest
+
+# Local imports
+import sys
+sys.path.append("../.")
+sys.path.append("tests")
+from clairvoyant import engine, profiling
+from testengine import market, logic
+
+class Methods(unittest.TestCase):
+
+    def test_report(self):
+        data = market()
+        reports = []
+        path = os.path.join(tempfile.mkdtemp(), 'profile.json')
+        s = engine.Simulation(['a', 'b'], 0, 99, 100, 150, 0.5, 0.5, continueTraining=True, retrainEvery=10, trainWindow=80)
+        s.instrument([reports.append, profiling.JSONSink(path)])
+        s.start(data, 1000, logic, random_state=0)
+        report = s.report()
+        self.assertEqual(reports, [report])
+        for phase in ('extract', 'fit', 'scale', 'predictProba', 'signal', 'totalValue', 'logic', 'purge', 'retrain'):
+            self.assertIn(phase, report['phases'])
+        self.assertEqual(report['phases']['logic']['calls'], 50)
+        self.assertEqual(report['counters'], {'days': 50, 'retrains': 5})
+        self.assertEqual(report['trainSizes'], [(0, 100), (10, 80), (20, 80), (30, 80), (40, 80), (50, 80)])
+        with open(path) as f: self.assertEqual(json.load(f)['counters'], report['counters'])
+
+    def test_stream(self):
+        data = market()
+        reports = []
+        b = engine.Backtest(['a', 'b'], 0, 99, 100, 150, 0.55, 0.55)
+        b.instrument([reports.append])
+        b.prepare(data, random_state=0)
+        for signal in b.stream(data.iloc[i] for i in range(100, 150)): pass
+        self.assertEqual(reports, [b.report()])
+        self.assertEqual(reports[0]['counters'], {'days': 50})
+        # Bars fed to onBar directly report when finished
+        s = engine.Simulation(['a', 'b'], 0, 99, 100, 150, 0.5, 0.5)
+        s.instrument([reports.append])
+        s.prepare(data, 1000, logic, random_state=0)
+        for i in range(100, 120): s.onBar(data.iloc[i])
+        s.finish()
+        self.assertEqual(reports[-1]['phases']['logic']['calls'], 20)
+
+    def test_disabled(self):
+        data = market()
+        a = engine.Backtest(['a', 'b'], 0, 99, 100, 150, 0.55, 0.55)
+        a.start(data, random_state=0)
+        self.assertIsNone(a.report())
+        b = engine.Backtest(['a', 'b'], 0, 99, 100, 150, 0.55, 0.55)
+        b.instrument()
+        b.start(data, random_state=0)
+        self.assertEqual(a.summary(), b.summary())
+        self.assertEqual(b.report()['phases']['predictProba']['calls'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
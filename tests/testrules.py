@@ -0,0 +1,40 @@
+import unittest
+
+# Local imports
+import sys
+sys.path.append("../.")
+sys.path.append("tests")
+from clairvoyant import engine, rules
+from testengine import market
+
+class Methods(unittest.TestCase):
+
+    def compare(self, rule):
+        data = market(500)
+        a = engine.Simulation(['a', 'b'], 0, 149, 150, 498, 0.5, 0.5)
+        a.start(data, 1000, rule, gamma=10, random_state=0)
+        b = engine.Simulation(['a', 'b'], 0, 149, 150, 498, 0.5, 0.5)
+        b.start(data, 1000, lambda *args: rule(*args), gamma=10, random_state=0) # Plain callback path
+        self.assertEqual(a.account.Equity, b.account.Equity)
+        self.assertEqual(a.account.BuyingPower, b.account.BuyingPower)
+        self.assertTrue(a.account.OpenedTrades.Frame().equals(b.account.OpenedTrades.Frame()))
+        self.assertTrue(a.account.ClosedTrades.Frame().equals(b.account.ClosedTrades.Frame()))
+        self.assertEqual([p.Shares for p in a.account.Positions], [p.Shares for p in b.account.Positions])
+        self.assertEqual(a.account.Date, b.account.Date)
+        return a
+
+    def test_long(self):
+        a = self.compare(rules.LongRule(0.5))
+        self.assertGreater(len(a.account.ClosedTrades), 10)
+
+    def test_stop(self):
+        a = self.compare(rules.LongRule(1.0, stopLoss=0.01))
+        self.assertGreater(len(a.account.ClosedTrades), 10)
+        self.compare(rules.LongRule(0.3, stopLoss=0.005))
+
+    def test_percent(self):
+        self.assertRaises(ValueError, rules.LongRule, 1.5)
+        self.assertRaises(TypeError, rules.Rule)
+
+if __name__ == '__main__':
+    unittest.main()